@@ -1,27 +1,76 @@
 import os
 import uuid
+import json
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+import queue
 import time
 import sys
-from flask import Flask, render_template, request, jsonify, send_file, url_for
-from werkzeug.utils import secure_filename
 import threading
-import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, Response, render_template, request, jsonify, send_file, url_for
+from werkzeug.exceptions import HTTPException
 
-# Configure detailed logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
+# Optional dependency - streamed multipart parsing for large uploads
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import BaseTarget, ValueTarget
+    HAS_STREAMING_FORM_DATA = True
+except ImportError:
+    StreamingFormDataParser = None
+    BaseTarget = object
+    ValueTarget = None
+    HAS_STREAMING_FORM_DATA = False
+
+# Conversion worker processes re-import this module under the spawn start
+# method; background threads and the log file belong to the web process only
+IS_WEB_PROCESS = multiprocessing.parent_process() is None
+
+# Configure logging. Request threads only enqueue records; a listener thread
+# does the console and file writes. Set PLY_CONVERTER_LOG_LEVEL=DEBUG for
+# per-request detail.
+LOG_LEVEL = os.environ.get('PLY_CONVERTER_LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+if IS_WEB_PROCESS:
+    _log_formatter = logging.Formatter(LOG_FORMAT)
+    _log_handlers = [
         logging.StreamHandler(sys.stdout),
         logging.FileHandler('ply_converter_app.log')
     ]
-)
+    for _handler in _log_handlers:
+        _handler.setFormatter(_log_formatter)
+    
+    _log_queue = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(_log_queue)
+    # QueueHandler renders the message (and any traceback) once; the listener's
+    # handlers add the timestamp/level prefix
+    _queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=LOG_LEVEL, handlers=[_queue_handler])
+    
+    _log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+else:
+    logging.basicConfig(level=LOG_LEVEL, format=LOG_FORMAT, handlers=[logging.StreamHandler(sys.stdout)])
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
+# Uploads that comfortably fit in free RAM are staged on tmpfs, so the
+# converter reads them back from memory instead of disk. None disables this.
+app.config['RAM_UPLOAD_FOLDER'] = '/dev/shm/ply-converter-uploads' if os.path.isdir('/dev/shm') else None
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
+# Uploads whose PLY header declares more element data than this are refused
+# as soon as the header arrives
+app.config['MAX_PLY_DATA_BYTES'] = app.config['MAX_CONTENT_LENGTH']
+# When served behind nginx, set this to an `internal` location aliased to the
+# output folder (e.g. /internal-outputs/) and nginx sends downloads itself
+app.config['ACCEL_REDIRECT_PREFIX'] = os.environ.get('PLY_CONVERTER_ACCEL_REDIRECT_PREFIX')
 
 logger = logging.getLogger(__name__)
 
@@ -32,101 +81,532 @@ os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 # Store conversion progress
 conversion_progress = {}
 conversion_results = {}
+# Per-job queues of progress snapshots, consumed by /progress-stream
+conversion_events = {}
+# Per-job callbacks notified on each progress update (see asgi.py)
+progress_listeners = {}
 
 ALLOWED_EXTENSIONS = {'ply'}
+# Ordered cheapest writer first; conversions export in this order
 OUTPUT_FORMATS = ['stl', 'obj', 'glb', '3mf', 'dxf']
 SMOOTHING_LEVELS = ['light', 'medium', 'high', 'ultra']
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB reads from the request stream
+PLY_HEADER_LIMIT = 64 * 1024  # a header that doesn't end within this is rejected
+PLY_FORMATS = {'ascii', 'binary_little_endian', 'binary_big_endian'}
+PLY_TYPE_SIZES = {
+    'char': 1, 'uchar': 1, 'int8': 1, 'uint8': 1,
+    'short': 2, 'ushort': 2, 'int16': 2, 'uint16': 2,
+    'int': 4, 'uint': 4, 'int32': 4, 'uint32': 4,
+    'float': 4, 'float32': 4, 'double': 8, 'float64': 8
+}
+SSE_KEEPALIVE_SECONDS = 15
+SSE_QUEUE_SIZE = 64
+TERMINAL_STATUSES = ('completed', 'error')
+
+# Finished conversions and their output files are kept this long, then reaped
+# even if the client never calls /cleanup
+def _result_ttl_seconds():
+    default = 24 * 3600
+    configured = os.environ.get('PLY_CONVERTER_RESULT_TTL', str(default))
+    try:
+        return max(1, int(configured))
+    except ValueError:
+        logging.getLogger(__name__).warning(f"Ignoring invalid PLY_CONVERTER_RESULT_TTL={configured!r}")
+        return default
+
+RESULT_TTL_SECONDS = _result_ttl_seconds()
+REAPER_INTERVAL_SECONDS = 600
+
+# Conversions run on a fixed pool of worker threads instead of one ad-hoc
+# thread per upload, so request threads only do I/O and burst uploads queue up
+# rather than oversubscribing the CPU. Meshing is CPU-heavy and gets slower
+# with more workers than physical cores, so default to half the logical CPUs.
+def _conversion_worker_count():
+    configured = os.environ.get('PLY_CONVERTER_WORKERS')
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError:
+            logging.getLogger(__name__).warning(f"Ignoring invalid PLY_CONVERTER_WORKERS={configured!r}")
+    return max(1, (os.cpu_count() or 2) // 2)
+
+CONVERSION_WORKERS = _conversion_worker_count()
+# Each conversion may fan its exports out to this many processes; together
+# the running conversions stay within the machine's cores
+EXPORT_WORKERS = max(1, (os.cpu_count() or 1) // CONVERSION_WORKERS)
+conversion_executor = ThreadPoolExecutor(
+    max_workers=CONVERSION_WORKERS,
+    thread_name_prefix='ply-convert'
+)
+
+# Each pool thread hands the actual conversion to a worker process, so
+# converter code that holds the GIL can't stall request threads. Spawned
+# (not forked) because this process already runs logging/reaper threads.
+_process_context = multiprocessing.get_context('spawn')
+_conversion_processes = None
+_conversion_processes_lock = threading.Lock()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def choose_upload_folder(content_length):
+    """Stage an upload on tmpfs when it fits in a quarter of free memory"""
+    ram_folder = app.config['RAM_UPLOAD_FOLDER']
+    if not ram_folder or not content_length:
+        return app.config['UPLOAD_FOLDER']
+    
+    try:
+        free_memory = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        tmpfs = os.statvfs(os.path.dirname(ram_folder))
+        tmpfs_free = tmpfs.f_bavail * tmpfs.f_frsize
+    except (AttributeError, ValueError, OSError):
+        return app.config['UPLOAD_FOLDER']
+    
+    if content_length > free_memory // 4 or content_length > tmpfs_free // 2:
+        return app.config['UPLOAD_FOLDER']
+    
+    try:
+        os.makedirs(ram_folder, exist_ok=True)
+    except OSError:
+        return app.config['UPLOAD_FOLDER']
+    return ram_folder
+
+def add_progress_listener(conversion_id, listener):
+    """Call ``listener(snapshot)`` on every progress update (used by the ASGI server)"""
+    progress_listeners.setdefault(conversion_id, []).append(listener)
+
+def remove_progress_listener(conversion_id, listener):
+    listeners = progress_listeners.get(conversion_id)
+    if listeners and listener in listeners:
+        listeners.remove(listener)
+        if not listeners:
+            progress_listeners.pop(conversion_id, None)
+
+def publish_progress(conversion_id, **fields):
+    """Update the progress snapshot and push a copy to the job's event stream"""
+    progress = conversion_progress.get(conversion_id)
+    if progress is None:
+        return
+    progress.update(fields)
+    
+    for listener in list(progress_listeners.get(conversion_id, ())):
+        try:
+            listener(progress.copy())
+        except Exception as e:
+            logger.warning(f"Progress listener for {conversion_id} failed: {e}")
+    
+    events = conversion_events.get(conversion_id)
+    if events is None:
+        return
+    snapshot = progress.copy()
+    try:
+        events.put_nowait(snapshot)
+    except queue.Full:
+        # Nobody is listening; only the latest state matters, so drop the oldest
+        try:
+            events.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            events.put_nowait(snapshot)
+        except queue.Full:
+            pass
+
+def report_progress(conversion_id, message, progress=None):
+    """Record a progress message for a conversion that is still running"""
+    progress_data = conversion_progress.get(conversion_id)
+    if progress_data is None or progress_data['status'] in TERMINAL_STATUSES:
+        # Late messages from a worker must not reopen a finished job
+        return
+    logger.info(f"[{conversion_id}] Progress: [{progress}%] {message}")
+    fields = {'status': 'converting', 'message': message}
+    if progress is not None:
+        fields['progress'] = min(int(progress), 100)
+    publish_progress(conversion_id, **fields)
+
+def _drain_worker_progress(progress_queue):
+    """Forward progress messages from worker processes to the job state"""
+    while True:
+        conversion_id, message, progress = progress_queue.get()
+        try:
+            report_progress(conversion_id, message, progress)
+        except Exception as e:
+            logger.error(f"Worker progress error: {e}")
+
+def get_conversion_processes():
+    """Process pool for conversions, created on first use (or after a crash)"""
+    global _conversion_processes
+    with _conversion_processes_lock:
+        if _conversion_processes is None:
+            from ply_converter import init_conversion_worker
+            
+            progress_queue = _process_context.Queue()
+            threading.Thread(
+                target=_drain_worker_progress,
+                args=(progress_queue,),
+                name='ply-progress',
+                daemon=True
+            ).start()
+            _conversion_processes = ProcessPoolExecutor(
+                max_workers=CONVERSION_WORKERS,
+                mp_context=_process_context,
+                initializer=init_conversion_worker,
+                initargs=(progress_queue,)
+            )
+        return _conversion_processes
+
+def reset_conversion_processes(broken_pool):
+    """Drop a pool whose worker died (e.g. OOM-killed) so the next job gets a fresh one"""
+    global _conversion_processes
+    with _conversion_processes_lock:
+        if _conversion_processes is broken_pool:
+            _conversion_processes = None
+    broken_pool.shutdown(wait=False)
+
+def refresh_queue_positions():
+    """Tell every waiting conversion how many jobs are ahead of it"""
+    queued = sorted(
+        (progress_data['created_at'], conversion_id)
+        for conversion_id, progress_data in list(conversion_progress.items())
+        if progress_data['status'] == 'queued'
+    )
+    running = sum(1 for progress_data in list(conversion_progress.values())
+                  if progress_data['status'] == 'converting')
+    free_workers = max(0, CONVERSION_WORKERS - running)
+    
+    for position, (_, conversion_id) in enumerate(queued):
+        if position < free_workers:
+            message = 'Waiting for a free conversion worker...'
+        else:
+            ahead = position - free_workers + 1
+            message = f"Queued behind {ahead} job{'s' if ahead != 1 else ''}..."
+        publish_progress(conversion_id, message=message)
+
+def build_download_links(conversion_id, results):
+    """Download URLs for a completed conversion, resolved once off the request thread"""
+    with app.test_request_context():
+        return {
+            format_name: url_for('download_file', conversion_id=conversion_id, format_name=format_name)
+            for format_name in results
+        }
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+class UploadRejected(Exception):
+    """Raised while receiving an upload that has to be refused"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def parse_ply_header(data):
+    """Validate a PLY header and read its element counts.
+
+    ``data`` is the start of the file. Returns the format, vertex and face
+    counts and an estimate of the element data size in bytes (exact for
+    binary files with triangle faces, a lower bound for ASCII).
+    """
+    if not (data.startswith(b'ply\n') or data.startswith(b'ply\r\n')):
+        raise UploadRejected('Not a valid PLY file (missing "ply" header)')
+    
+    end = data.find(b'end_header')
+    if end < 0:
+        raise UploadRejected('Not a valid PLY file (header is incomplete or too long)')
+    
+    ply_format = None
+    elements = []
+    try:
+        for line in data[:end].decode('ascii', 'replace').splitlines()[1:]:
+            parts = line.split()
+            if not parts:
+                continue
+            if parts[0] == 'format':
+                ply_format = parts[1]
+            elif parts[0] == 'element':
+                elements.append({'name': parts[1], 'count': int(parts[2]), 'bytes': 0, 'values': 0})
+            elif parts[0] == 'property' and elements:
+                if parts[1] == 'list':
+                    # Assume triangles: one count followed by three indices
+                    elements[-1]['bytes'] += PLY_TYPE_SIZES[parts[2]] + 3 * PLY_TYPE_SIZES[parts[3]]
+                    elements[-1]['values'] += 4
+                else:
+                    elements[-1]['bytes'] += PLY_TYPE_SIZES[parts[1]]
+                    elements[-1]['values'] += 1
+    except (IndexError, KeyError, ValueError):
+        raise UploadRejected('Not a valid PLY file (malformed header)')
+    
+    if ply_format not in PLY_FORMATS:
+        raise UploadRejected(f'Unsupported PLY format: {ply_format}')
+    
+    counts = {element['name']: element['count'] for element in elements}
+    if 'vertex' not in counts:
+        raise UploadRejected('PLY file has no vertex element')
+    
+    if ply_format == 'ascii':
+        # At least one digit and one separator per value
+        data_bytes = sum(element['count'] * element['values'] * 2 for element in elements)
+    else:
+        data_bytes = sum(element['count'] * element['bytes'] for element in elements)
+    
+    return {
+        'format': ply_format,
+        'vertex_count': counts['vertex'],
+        'face_count': counts.get('face', 0),
+        'data_bytes': data_bytes
+    }
+
+def validate_ply_header(data):
+    """Parse the header and refuse files that declare more data than allowed"""
+    header = parse_ply_header(data)
+    limit = app.config['MAX_PLY_DATA_BYTES']
+    if header['data_bytes'] > limit:
+        raise UploadRejected(
+            f"PLY declares {header['vertex_count']} vertices and {header['face_count']} faces "
+            f"(~{header['data_bytes'] // (1024 * 1024)}MB), over the {limit // (1024 * 1024)}MB limit.",
+            status_code=413
+        )
+    return header
+
+class _UploadFileTarget(BaseTarget):
+    """Streams the multipart ``file`` field straight to disk.
+
+    The filename is checked when the part starts and the PLY header once it
+    has arrived, so a bad upload is refused before anything is written.
+    """
+
+    def __init__(self, upload_folder, conversion_id):
+        super().__init__()
+        self.upload_folder = upload_folder
+        self.conversion_id = conversion_id
+        self.filename = None
+        self.path = None
+        self.header = None
+        self.rejection = None
+        self._buffer = bytearray()
+        self._fd = None
+
+    @property
+    def rejected(self):
+        return self.rejection is not None
+
+    def on_start(self):
+        self.filename = self.multipart_filename or ''
+        if not allowed_file(self.filename):
+            self.rejection = UploadRejected('Only PLY files are allowed')
+            return
+        self.path = os.path.join(self.upload_folder, f"{self.conversion_id}.ply")
+
+    def on_data_received(self, chunk):
+        if self.rejected:
+            return
+        if self._fd is not None:
+            self._fd.write(chunk)
+            return
+        
+        # Hold the first bytes back until the whole header is here
+        self._buffer += chunk
+        if b'end_header' in self._buffer or len(self._buffer) >= PLY_HEADER_LIMIT:
+            self._accept_header()
+
+    def on_finish(self):
+        if not self.rejected and self._fd is None:
+            # Body ended before the header did (or exactly with it)
+            self._accept_header()
+        self.close()
+
+    def _accept_header(self):
+        try:
+            self.header = validate_ply_header(bytes(self._buffer))
+        except UploadRejected as e:
+            self.rejection = e
+            return
+        self._fd = open(self.path, 'wb')
+        self._fd.write(self._buffer)
+        self._buffer = bytearray()
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+
+    def discard(self):
+        """Close and delete a partially received file"""
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+class _ListValueTarget(BaseTarget):
+    """Collects every value of a repeated form field (e.g. ``formats``)"""
+
+    def __init__(self):
+        super().__init__()
+        self.values = []
+        self._parts = []
+
+    def on_start(self):
+        self._parts = []
+
+    def on_data_received(self, chunk):
+        self._parts.append(chunk)
+
+    def on_finish(self):
+        self.values.append(b''.join(self._parts).decode('utf-8', 'replace'))
+
+def receive_upload_streaming(conversion_id):
+    """Parse the multipart body chunk by chunk, writing the PLY directly to disk.
+
+    Bypasses werkzeug's form parser, which is CPU-bound on large uploads.
+    """
+    file_target = _UploadFileTarget(choose_upload_folder(request.content_length), conversion_id)
+    formats_target = _ListValueTarget()
+    smoothing_target = ValueTarget()
+    
+    try:
+        parser = StreamingFormDataParser(headers={'Content-Type': request.content_type})
+    except Exception as e:
+        raise UploadRejected(f'Malformed upload: {e}')
+    parser.register('file', file_target)
+    parser.register('formats', formats_target)
+    parser.register('smoothing', smoothing_target)
+    
+    try:
+        while True:
+            chunk = request.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.data_received(chunk)
+            if file_target.rejected:
+                break
+    except Exception:
+        file_target.discard()
+        raise
+    finally:
+        file_target.close()
+    
+    if file_target.filename is None:
+        raise UploadRejected('No file uploaded')
+    if file_target.filename == '':
+        raise UploadRejected('No file selected')
+    if file_target.rejected:
+        raise file_target.rejection
+    
+    return {
+        'filename': file_target.filename,
+        'input_path': file_target.path,
+        'header': file_target.header,
+        'output_formats': formats_target.values,
+        'smoothing_level': smoothing_target.value.decode('utf-8', 'replace') or 'medium'
+    }
+
+def receive_upload_form(conversion_id):
+    """Fallback upload path through werkzeug's form parser"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Request files: {list(request.files.keys())}")
+        logger.debug(f"Request form: {dict(request.form)}")
+    
+    if 'file' not in request.files:
+        raise UploadRejected('No file uploaded')
+    
+    file = request.files['file']
+    logger.debug("File received: %s, size: %s", file.filename, file.content_length)
+    
+    if file.filename == '':
+        raise UploadRejected('No file selected')
+    
+    if not allowed_file(file.filename):
+        raise UploadRejected('Only PLY files are allowed')
+    
+    # The client's filename is only shown back to it; on disk the upload is
+    # named after the conversion
+    filename = file.filename
+    input_path = os.path.join(choose_upload_folder(request.content_length), f"{conversion_id}.ply")
+    
+    logger.debug("Saving file to: %s", input_path)
+    file.save(input_path)
+    
+    try:
+        with open(input_path, 'rb') as fh:
+            header = validate_ply_header(fh.read(PLY_HEADER_LIMIT))
+    except UploadRejected:
+        os.remove(input_path)
+        raise
+    
+    return {
+        'filename': filename,
+        'input_path': input_path,
+        'header': header,
+        'output_formats': request.form.getlist('formats'),
+        'smoothing_level': request.form.get('smoothing', 'medium')
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    logger.info("=== UPLOAD REQUEST RECEIVED ===")
-    
     try:
-        # Log request details
-        logger.info(f"Request method: {request.method}")
-        logger.info(f"Request files: {list(request.files.keys())}")
-        logger.info(f"Request form: {dict(request.form)}")
-        
-        if 'file' not in request.files:
-            logger.error("No file in request")
-            return jsonify({'error': 'No file uploaded'}), 400
-        
-        file = request.files['file']
-        logger.info(f"File received: {file.filename}, size: {file.content_length}")
-        
-        if file.filename == '':
-            logger.error("No file selected")
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not allowed_file(file.filename):
-            logger.error(f"Invalid file type: {file.filename}")
-            return jsonify({'error': 'Only PLY files are allowed'}), 400
-        
         # Generate unique ID for this conversion
         conversion_id = str(uuid.uuid4())
-        logger.info(f"Generated conversion ID: {conversion_id}")
+        logger.debug("Upload received, conversion ID: %s", conversion_id)
         
-        # Save uploaded file
-        filename = secure_filename(file.filename)
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{conversion_id}_{filename}")
+        # Receive the uploaded file
+        if HAS_STREAMING_FORM_DATA and request.mimetype == 'multipart/form-data':
+            upload = receive_upload_streaming(conversion_id)
+        else:
+            upload = receive_upload_form(conversion_id)
         
-        logger.info(f"Saving file to: {input_path}")
-        file.save(input_path)
+        filename = upload['filename']
+        input_path = upload['input_path']
         
         # Verify file was saved
         if os.path.exists(input_path):
             file_size = os.path.getsize(input_path)
-            logger.info(f"✓ File saved successfully: {file_size} bytes")
         else:
             logger.error("✗ File save failed")
             return jsonify({'error': 'File save failed'}), 500
         
         # Get parameters
-        output_formats = request.form.getlist('formats')
+        output_formats = upload['output_formats']
         if not output_formats:
             output_formats = ['stl']
         
-        smoothing_level = request.form.get('smoothing', 'medium')
+        smoothing_level = upload['smoothing_level']
         if smoothing_level not in SMOOTHING_LEVELS:
             smoothing_level = 'medium'
         
-        # Validate output formats
-        valid_formats = [fmt for fmt in output_formats if fmt in OUTPUT_FORMATS]
+        # Validate output formats. The converter parses and meshes the PLY once
+        # and writes every format from that mesh; list each format once,
+        # cheapest writer first.
+        valid_formats = [fmt for fmt in OUTPUT_FORMATS if fmt in output_formats]
         if not valid_formats:
             logger.error(f"No valid formats: {output_formats}")
+            os.remove(input_path)
             return jsonify({'error': 'Invalid output formats specified'}), 400
         
-        logger.info(f"Conversion parameters: formats={valid_formats}, smoothing={smoothing_level}")
-        
         # Initialize progress tracking
+        conversion_events[conversion_id] = queue.Queue(maxsize=SSE_QUEUE_SIZE)
         conversion_progress[conversion_id] = {
-            'status': 'starting',
+            'status': 'queued',
             'progress': 0,
-            'message': 'Initializing smooth surface conversion...',
+            'message': 'Waiting for a free conversion worker...',
             'input_file': filename,
             'output_formats': valid_formats,
             'smoothing_level': smoothing_level,
+            'vertex_count': upload['header']['vertex_count'],
+            'face_count': upload['header']['face_count'],
             'created_at': time.time()
         }
         
-        logger.info(f"Progress tracking initialized for {conversion_id}")
-        
-        # Start conversion in background thread
-        logger.info("Starting background conversion thread...")
-        thread = threading.Thread(
-            target=convert_file_async_debug,
-            args=(conversion_id, input_path, valid_formats, smoothing_level),
-            daemon=True
+        # Hand the conversion to the worker pool; it waits there while every
+        # worker is busy
+        conversion_executor.submit(
+            convert_file_async_debug,
+            conversion_id, input_path, valid_formats, smoothing_level
+        )
+        refresh_queue_positions()
+        logger.info(
+            f"Conversion {conversion_id} queued: {filename} ({file_size} bytes), "
+            f"formats={valid_formats}, smoothing={smoothing_level}"
         )
-        thread.start()
-        logger.info("✓ Background thread started")
         
         response_data = {
             'conversion_id': conversion_id,
@@ -136,12 +616,23 @@ def upload_file():
             'smoothing_level': smoothing_level
         }
         
-        logger.info(f"Returning response: {response_data}")
         return jsonify(response_data)
         
+    except UploadRejected as e:
+        logger.error(f"Upload rejected: {e}")
+        response = jsonify({'error': str(e)})
+        response.status_code = e.status_code
+        if e.status_code == 413:
+            # The rest of the body is not read; stop the client sending it
+            response.headers['Connection'] = 'close'
+        return response
+    
+    except HTTPException:
+        # Let the 413 handler answer uploads over MAX_CONTENT_LENGTH
+        raise
+    
     except Exception as e:
-        logger.error(f"Upload error: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.error(f"Upload error: {str(e)}", exc_info=True)
         return jsonify({'error': f'Upload failed: {str(e)}'}), 500
 
 def convert_file_async_debug(conversion_id, input_path, output_formats, smoothing_level='medium'):
@@ -152,34 +643,24 @@ def convert_file_async_debug(conversion_id, input_path, output_formats, smoothin
         # Update progress function
         def progress_callback(message, progress=None):
             try:
-                logger.info(f"[{conversion_id}] Progress: [{progress}%] {message}")
-                if conversion_id in conversion_progress:
-                    conversion_progress[conversion_id]['message'] = message
-                    if progress is not None:
-                        conversion_progress[conversion_id]['progress'] = min(int(progress), 100)
-                    conversion_progress[conversion_id]['status'] = 'converting'
+                report_progress(conversion_id, message, progress)
             except Exception as e:
                 logger.error(f"Progress callback error: {e}")
         
         # Test if we can import the converter
         progress_callback("Loading PLY converter...", 5)
+        refresh_queue_positions()
         
         try:
-            from ply_converter import PLYConverter
+            from ply_converter import run_conversion
             logger.info("✓ PLYConverter imported successfully")
         except Exception as import_error:
             logger.error(f"✗ PLYConverter import failed: {import_error}")
             raise RuntimeError(f"Failed to import PLYConverter: {import_error}")
         
-        # Test if we can create converter instance
-        progress_callback("Creating converter instance...", 10)
-        
-        try:
-            converter = PLYConverter()
-            logger.info("✓ PLYConverter instance created")
-        except Exception as create_error:
-            logger.error(f"✗ PLYConverter creation failed: {create_error}")
-            raise RuntimeError(f"Failed to create converter: {create_error}")
+        # Make sure a worker process is available
+        progress_callback("Starting converter process...", 10)
+        processes = get_conversion_processes()
         
         # Check input file
         progress_callback("Checking input file...", 15)
@@ -198,55 +679,66 @@ def convert_file_async_debug(conversion_id, input_path, output_formats, smoothin
         
         # Start actual conversion
         progress_callback("Starting PLY conversion...", 20)
-        logger.info(f"Calling converter.convert_ply with:")
-        logger.info(f"  input_path: {input_path}")
-        logger.info(f"  output_dir: {output_dir}")
-        logger.info(f"  formats: {output_formats}")
-        logger.info(f"  conversion_id: {conversion_id}")
-        logger.info(f"  smoothing: {smoothing_level}")
-        
-        # Perform conversion
-        results = converter.convert_ply(
-            input_path, 
-            output_dir, 
-            output_formats,
-            conversion_id,
-            progress_callback,
-            smoothing_level=smoothing_level
+        logger.debug(
+            "Calling converter.convert_ply: input_path=%s, output_dir=%s, formats=%s, smoothing=%s",
+            input_path, output_dir, output_formats, smoothing_level
         )
         
+        # Perform conversion in a worker process
+        try:
+            results = processes.submit(
+                run_conversion,
+                input_path,
+                output_dir,
+                output_formats,
+                conversion_id,
+                smoothing_level,
+                EXPORT_WORKERS
+            ).result()
+        except BrokenProcessPool:
+            reset_conversion_processes(processes)
+            raise RuntimeError("Converter process exited unexpectedly (out of memory?)")
+        
         logger.info(f"✅ Conversion completed! Results: {results}")
         
-        # Verify output files
+        # Verify output files. The converter renames each file into place
+        # only once it is complete, so one stat here is all it needs.
         verified_results = {}
+        file_sizes = {}
         for format_name, file_path in results.items():
-            if file_path and os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
-                logger.info(f"✓ Output file verified: {format_name} -> {file_path} ({file_size} bytes)")
-                verified_results[format_name] = file_path
-            else:
+            try:
+                file_size = Path(file_path).stat(follow_symlinks=False).st_size
+            except (OSError, TypeError):
                 logger.warning(f"✗ Output file missing: {format_name} -> {file_path}")
+                continue
+            logger.info(f"✓ Output file verified: {format_name} -> {file_path} ({file_size} bytes)")
+            verified_results[format_name] = file_path
+            file_sizes[format_name] = file_size
         
         if not verified_results:
             raise RuntimeError("No output files were created successfully")
         
         # Store results
         conversion_results[conversion_id] = verified_results
-        conversion_progress[conversion_id]['status'] = 'completed'
-        conversion_progress[conversion_id]['progress'] = 100
-        conversion_progress[conversion_id]['message'] = f'Conversion completed! {len(verified_results)} files created.'
+        # Outputs were just verified, so the links are final; polls and the
+        # event stream reuse them as-is
+        publish_progress(
+            conversion_id,
+            status='completed',
+            progress=100,
+            message=f'Conversion completed! {len(verified_results)} files created.',
+            download_links=build_download_links(conversion_id, verified_results),
+            file_sizes=file_sizes
+        )
         
         logger.info(f"✅ Conversion {conversion_id} completed successfully")
         
     except Exception as e:
         error_msg = f'Conversion failed: {str(e)}'
-        logger.error(f"❌ Conversion {conversion_id} failed: {error_msg}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.error(f"❌ Conversion {conversion_id} failed: {error_msg}", exc_info=True)
         
         # Update progress with error
-        if conversion_id in conversion_progress:
-            conversion_progress[conversion_id]['status'] = 'error'
-            conversion_progress[conversion_id]['message'] = error_msg
+        publish_progress(conversion_id, status='error', message=error_msg)
     
     finally:
         # Clean up input file
@@ -259,42 +751,71 @@ def convert_file_async_debug(conversion_id, input_path, output_formats, smoothin
 
 @app.route('/progress/<conversion_id>')
 def get_progress(conversion_id):
-    """Get conversion progress with detailed logging"""
-    logger.info(f"Progress request for: {conversion_id}")
-    
+    """Get conversion progress"""
     try:
         if conversion_id not in conversion_progress:
             logger.warning(f"Progress requested for unknown conversion: {conversion_id}")
-            logger.info(f"Available conversions: {list(conversion_progress.keys())}")
             return jsonify({'error': 'Conversion not found'}), 404
         
         progress_data = conversion_progress[conversion_id].copy()
-        logger.info(f"Progress data: {progress_data}")
-        
-        # Add download links if conversion is completed
-        if progress_data['status'] == 'completed' and conversion_id in conversion_results:
-            results = conversion_results[conversion_id]
-            progress_data['download_links'] = {}
-            
-            for format_name, file_path in results.items():
-                if file_path and os.path.exists(file_path):
-                    download_url = url_for('download_file', conversion_id=conversion_id, format_name=format_name)
-                    progress_data['download_links'][format_name] = download_url
-                    logger.info(f"Added download link: {format_name} -> {download_url}")
         
-        logger.info(f"Returning progress: {progress_data}")
+        logger.debug("Progress for %s: %s", conversion_id, progress_data)
         return jsonify(progress_data)
         
     except Exception as e:
-        logger.error(f"Progress check error for {conversion_id}: {str(e)}")
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.error(f"Progress check error for {conversion_id}: {str(e)}", exc_info=True)
         return jsonify({'error': f'Progress check failed: {str(e)}'}), 500
 
+@app.route('/progress-stream/<conversion_id>')
+def stream_progress(conversion_id):
+    """Push progress updates as Server-Sent Events until the job finishes"""
+    if conversion_id not in conversion_progress or conversion_id not in conversion_events:
+        logger.warning(f"Progress stream requested for unknown conversion: {conversion_id}")
+        return jsonify({'error': 'Conversion not found'}), 404
+    
+    events = conversion_events[conversion_id]
+    logger.debug("Progress stream opened for: %s", conversion_id)
+    
+    def format_event(progress_data):
+        return f"data: {json.dumps(progress_data)}\n\n"
+    
+    def generate():
+        # Anything already queued is older than the current snapshot
+        while True:
+            try:
+                events.get_nowait()
+            except queue.Empty:
+                break
+        
+        progress_data = conversion_progress.get(conversion_id)
+        if progress_data is None:
+            return
+        progress_data = progress_data.copy()
+        yield format_event(progress_data)
+        
+        while progress_data['status'] not in TERMINAL_STATUSES:
+            try:
+                progress_data = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                progress_data = conversion_progress.get(conversion_id)
+                if progress_data is None:
+                    return
+                progress_data = progress_data.copy()
+                if progress_data['status'] not in TERMINAL_STATUSES:
+                    # Comment line keeps proxies from timing out an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+            yield format_event(progress_data)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/download/<conversion_id>/<format_name>')
 def download_file(conversion_id, format_name):
-    """Download converted file with logging"""
-    logger.info(f"Download request: {conversion_id}/{format_name}")
-    
+    """Download converted file"""
     try:
         if conversion_id not in conversion_results:
             logger.warning(f"Download requested for unknown conversion: {conversion_id}")
@@ -303,23 +824,34 @@ def download_file(conversion_id, format_name):
         results = conversion_results[conversion_id]
         if format_name not in results:
             logger.warning(f"Download requested for unknown format: {format_name}")
-            logger.info(f"Available formats: {list(results.keys())}")
             return jsonify({'error': 'Format not found'}), 404
         
         file_path = results[format_name]
-        if not file_path or not os.path.exists(file_path):
-            logger.error(f"Download file not found: {file_path}")
-            return jsonify({'error': 'File not found'}), 404
-        
-        file_size = os.path.getsize(file_path)
-        logger.info(f"Serving download: {file_path} ({file_size} bytes)")
-        
+        logger.info(f"Serving download: {file_path}")
+        download_name = f"smooth_{conversion_id}.{format_name}"
+        
+        accel_prefix = app.config['ACCEL_REDIRECT_PREFIX']
+        if accel_prefix:
+            return Response(headers={
+                'X-Accel-Redirect': f"{accel_prefix.rstrip('/')}/{os.path.basename(file_path)}",
+                'Content-Disposition': f'attachment; filename="{download_name}"'
+            })
+        
+        # Conditional + range requests let clients resume interrupted downloads;
+        # the body goes out through wsgi.file_wrapper where the server has one
         return send_file(
             file_path,
             as_attachment=True,
-            download_name=f"smooth_{conversion_id}.{format_name}"
+            download_name=download_name,
+            conditional=True,
+            etag=True,
+            max_age=0
         )
         
+    except FileNotFoundError:
+        logger.error(f"Download file not found: {file_path}")
+        return jsonify({'error': 'File not found'}), 404
+    
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
@@ -336,30 +868,68 @@ def status():
         'output_folder_exists': os.path.exists(app.config['OUTPUT_FOLDER'])
     })
 
+def discard_conversion(conversion_id):
+    """Drop all tracking state for a conversion and delete its output files"""
+    # Remove from progress tracking
+    if conversion_progress.pop(conversion_id, None) is not None:
+        logger.info(f"✓ Removed {conversion_id} from progress tracking")
+    conversion_events.pop(conversion_id, None)
+    progress_listeners.pop(conversion_id, None)
+    
+    # Remove output files and cleanup results
+    results = conversion_results.pop(conversion_id, None)
+    if results is not None:
+        for file_path in results.values():
+            try:
+                os.remove(file_path)
+                logger.info(f"✓ Removed file: {file_path}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to remove file {file_path}: {e}")
+        logger.info(f"✓ Cleaned up results for {conversion_id}")
+
+def reap_expired_conversions():
+    """Discard finished conversions and stray files older than RESULT_TTL_SECONDS"""
+    cutoff = time.time() - RESULT_TTL_SECONDS
+    
+    for conversion_id, progress_data in list(conversion_progress.items()):
+        if progress_data['status'] in TERMINAL_STATUSES and progress_data['created_at'] < cutoff:
+            logger.info(f"Reaping expired conversion: {conversion_id}")
+            discard_conversion(conversion_id)
+    
+    # Files left behind by a restart or a crashed job are no longer tracked
+    folders = [app.config['OUTPUT_FOLDER'], app.config['UPLOAD_FOLDER']]
+    if app.config['RAM_UPLOAD_FOLDER'] and os.path.isdir(app.config['RAM_UPLOAD_FOLDER']):
+        folders.append(app.config['RAM_UPLOAD_FOLDER'])
+    for folder in folders:
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        logger.info(f"✓ Reaped stale file: {entry.path}")
+        except OSError as e:
+            logger.warning(f"Reaping {folder} failed: {e}")
+
+def _reaper_loop():
+    while not _reaper_stop.wait(REAPER_INTERVAL_SECONDS):
+        try:
+            reap_expired_conversions()
+        except Exception as e:
+            logger.error(f"Reaper error: {e}")
+
+_reaper_stop = threading.Event()
+if IS_WEB_PROCESS:
+    threading.Thread(target=_reaper_loop, name='ply-reaper', daemon=True).start()
+
 @app.route('/cleanup/<conversion_id>', methods=['POST'])
 def cleanup_conversion(conversion_id):
     """Clean up conversion files and data"""
     logger.info(f"Cleanup request: {conversion_id}")
     
     try:
-        # Remove from progress tracking
-        if conversion_id in conversion_progress:
-            del conversion_progress[conversion_id]
-            logger.info("✓ Removed from progress tracking")
-        
-        # Remove output files and cleanup results
-        if conversion_id in conversion_results:
-            results = conversion_results[conversion_id]
-            for file_path in results.values():
-                if file_path and os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        logger.info(f"✓ Removed file: {file_path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to remove file {file_path}: {e}")
-            del conversion_results[conversion_id]
-            logger.info("✓ Cleaned up results")
-        
+        discard_conversion(conversion_id)
         return jsonify({'message': 'Cleanup completed'})
         
     except Exception as e:
@@ -392,7 +962,9 @@ if __name__ == '__main__':
     print("Endpoints:")
     print("  http://localhost:5000/ - Main interface")
     print("  http://localhost:5000/status - Status check")
+    print("  http://localhost:5000/progress-stream/<id> - Progress events (SSE)")
     print("")
+    print(f"Conversion workers: {CONVERSION_WORKERS}")
     print("Logs are saved to: ply_converter_app.log")
     print("=" * 60)
     
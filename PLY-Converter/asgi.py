@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for PLY Converter
+
+Progress polling and the progress event stream are served directly on the
+event loop, so open SSE connections don't each hold a server thread; every
+other route is handed to the Flask app through asgiref's WSGI adapter.
+
+Run with:
+    PLY_CONVERTER_SERVER=uvicorn python run_local.py
+or:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 1
+
+Keep a single worker process: progress state lives in this process's memory.
+"""
+
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as ply_app
+
+flask_application = WsgiToAsgi(ply_app.app)
+
+JSON_HEADERS = [(b'content-type', b'application/json')]
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream'),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+
+
+async def send_json(send, status, payload):
+    await send({'type': 'http.response.start', 'status': status, 'headers': JSON_HEADERS})
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+
+def format_event(progress_data):
+    return f"data: {json.dumps(progress_data)}\n\n".encode()
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def progress(send, conversion_id):
+    progress_data = ply_app.conversion_progress.get(conversion_id)
+    if progress_data is None:
+        ply_app.logger.warning(f"Progress requested for unknown conversion: {conversion_id}")
+        await send_json(send, 404, {'error': 'Conversion not found'})
+        return
+    await send_json(send, 200, progress_data.copy())
+
+
+async def stream_progress(receive, send, conversion_id):
+    """Push progress updates as Server-Sent Events until the job finishes"""
+    if conversion_id not in ply_app.conversion_progress:
+        ply_app.logger.warning(f"Progress stream requested for unknown conversion: {conversion_id}")
+        await send_json(send, 404, {'error': 'Conversion not found'})
+        return
+
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue()
+
+    def listener(snapshot):
+        # Called from the conversion threads; hand off to the event loop
+        loop.call_soon_threadsafe(updates.put_nowait, snapshot)
+
+    ply_app.add_progress_listener(conversion_id, listener)
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        progress_data = ply_app.conversion_progress.get(conversion_id)
+        if progress_data is None:
+            await send_json(send, 404, {'error': 'Conversion not found'})
+            return
+        progress_data = progress_data.copy()
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        await send({'type': 'http.response.body', 'body': format_event(progress_data), 'more_body': True})
+
+        while progress_data['status'] not in ply_app.TERMINAL_STATUSES:
+            update = asyncio.ensure_future(updates.get())
+            done, _ = await asyncio.wait(
+                {update, disconnect},
+                timeout=ply_app.SSE_KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                update.cancel()
+                ply_app.logger.debug("Progress stream closed by client: %s", conversion_id)
+                return
+            if update in done:
+                progress_data = update.result()
+                body = format_event(progress_data)
+            else:
+                update.cancel()
+                progress_data = ply_app.conversion_progress.get(conversion_id)
+                if progress_data is None:
+                    break
+                progress_data = progress_data.copy()
+                if progress_data['status'] in ply_app.TERMINAL_STATUSES:
+                    body = format_event(progress_data)
+                else:
+                    body = b": keepalive\n\n"
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnect.cancel()
+        ply_app.remove_progress_listener(conversion_id, listener)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+        prefix, _, conversion_id = scope['path'].lstrip('/').partition('/')
+        if conversion_id and '/' not in conversion_id:
+            if prefix == 'progress':
+                await progress(send, conversion_id)
+                return
+            if prefix == 'progress-stream':
+                await stream_progress(receive, send, conversion_id)
+                return
+
+    await flask_application(scope, receive, send)
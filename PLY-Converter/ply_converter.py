@@ -12,18 +12,26 @@ Dependencies (required):
   pip install trimesh numpy plyfile scipy
 
 Dependencies (optional for advanced features):
-  pip install open3d scikit-image
+  pip install open3d scikit-image numba
 """
 from __future__ import annotations
 
+import gc
+import inspect
+import multiprocessing
 import os
+import re
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from functools import lru_cache
 from typing import Optional, Dict, Any, Callable
 
 import numpy as np
 import trimesh
+import trimesh.smoothing
 from plyfile import PlyData, PlyElement
 
 # Optional dependencies - graceful fallback if not available
@@ -50,12 +58,254 @@ except ImportError:
     skmeasure = None
     HAS_SKIMAGE = False
 
+try:
+    from numba import njit, prange, types
+    from numba.typed import Dict as NumbaDict
+    HAS_NUMBA = True
+except ImportError:
+    njit = prange = types = NumbaDict = None
+    HAS_NUMBA = False
+
 
 def log(msg: str) -> None:
     """Simple logging function"""
     print(f"[PLY-Converter] {msg}", flush=True)
 
 
+def canonical_face_rotation(faces: np.ndarray) -> np.ndarray:
+    """
+    Rotate each triangle so its smallest index comes first.
+
+    Unlike sorting the indices this keeps the winding, so a face and its
+    reversed twin stay distinct.
+    """
+    first = faces.argmin(axis=1)
+    order = (first[:, None] + np.arange(3)) % 3
+    return np.take_along_axis(faces, order, axis=1)
+
+
+def _face_keys(faces: np.ndarray, vertex_count: Optional[int] = None) -> np.ndarray:
+    """
+    One integer per face for np.unique, which is far faster on plain int64
+    than on structured rows. Indices are packed into three 21-bit fields when
+    they fit, otherwise hashed by trimesh.
+    """
+    if vertex_count is None:
+        vertex_count = int(faces.max()) + 1 if len(faces) else 0
+    if vertex_count <= 2 ** 21:
+        faces = faces.astype(np.int64, copy=False)
+        return (faces[:, 0] << 42) | (faces[:, 1] << 21) | faces[:, 2]
+    return trimesh.grouping.hashable_rows(np.ascontiguousarray(faces))
+
+
+def make_double_sided(faces: np.ndarray) -> np.ndarray:
+    """Faces followed by their reversed-winding copies, written into one buffer"""
+    if HAS_NUMBA:
+        try:
+            return _make_double_sided_numba(np.ascontiguousarray(faces))
+        except Exception as e:
+            log(f"Numba double-sided fill failed ({e}), using NumPy")
+    
+    n = len(faces)
+    all_faces = np.empty((2 * n, 3), dtype=faces.dtype)
+    all_faces[:n] = faces
+    all_faces[n:, 0] = faces[:, 0]
+    all_faces[n:, 1] = faces[:, 2]
+    all_faces[n:, 2] = faces[:, 1]
+    return all_faces
+
+
+def _build_double_sided_numpy(faces: np.ndarray) -> np.ndarray:
+    all_faces = make_double_sided(faces)
+    # First occurrence wins, so originals are kept over matching flips
+    _, first = np.unique(_face_keys(canonical_face_rotation(all_faces)), return_index=True)
+    first.sort()
+    return all_faces[first]
+
+
+if HAS_NUMBA:
+    # Typed-dict key for a face; numba can't build this type inside a jitted function
+    _FACE_KEY = types.UniTuple(types.int64, 3)
+
+    @njit(cache=True)
+    def _canonical_key(a, b, c):
+        if a <= b and a <= c:
+            return (a, b, c)
+        if b <= c:
+            return (b, c, a)
+        return (c, a, b)
+
+    @njit(parallel=True, cache=True)
+    def _make_double_sided_numba(faces):
+        n = faces.shape[0]
+        out = np.empty((2 * n, 3), dtype=faces.dtype)
+        for i in prange(n):
+            out[i, 0] = faces[i, 0]
+            out[i, 1] = faces[i, 1]
+            out[i, 2] = faces[i, 2]
+            out[n + i, 0] = faces[i, 0]
+            out[n + i, 1] = faces[i, 2]
+            out[n + i, 2] = faces[i, 1]
+        return out
+
+    @njit(parallel=True, cache=True)
+    def _build_double_sided_numba(faces):
+        n = faces.shape[0]
+        seen = NumbaDict.empty(key_type=_FACE_KEY, value_type=types.int64)
+        keep = np.zeros(n, dtype=np.bool_)
+        for i in range(n):
+            key = _canonical_key(np.int64(faces[i, 0]), np.int64(faces[i, 1]), np.int64(faces[i, 2]))
+            if key not in seen:
+                seen[key] = i
+                keep[i] = True
+        
+        # Lookups only from here on, so the flips can be checked in parallel
+        add = np.zeros(n, dtype=np.bool_)
+        for i in prange(n):
+            if keep[i]:
+                key = _canonical_key(np.int64(faces[i, 0]), np.int64(faces[i, 2]), np.int64(faces[i, 1]))
+                add[i] = key not in seen
+        
+        n_keep = 0
+        n_add = 0
+        for i in range(n):
+            if keep[i]:
+                n_keep += 1
+            if add[i]:
+                n_add += 1
+        
+        out = np.empty((n_keep + n_add, 3), dtype=faces.dtype)
+        row = 0
+        for i in range(n):
+            if keep[i]:
+                out[row, 0] = faces[i, 0]
+                out[row, 1] = faces[i, 1]
+                out[row, 2] = faces[i, 2]
+                row += 1
+        for i in range(n):
+            if add[i]:
+                out[row, 0] = faces[i, 0]
+                out[row, 1] = faces[i, 2]
+                out[row, 2] = faces[i, 1]
+                row += 1
+        return out
+
+
+def build_double_sided(faces: np.ndarray) -> np.ndarray:
+    """
+    Duplicate faces with reversed winding, dropping repeats.
+
+    Faces are compared with their winding, so an existing back face isn't
+    added twice and a face is never merged with its own flip (which
+    remove_duplicate_faces would do, undoing the double-siding).
+    """
+    faces = np.asarray(faces)
+    if len(faces) == 0:
+        return faces.reshape(0, 3)
+    if HAS_NUMBA:
+        try:
+            return _build_double_sided_numba(np.ascontiguousarray(faces))
+        except Exception as e:
+            log(f"Numba double-sided kernel failed ({e}), using NumPy")
+    return _build_double_sided_numpy(faces)
+
+
+def dedupe_mesh(mesh: trimesh.Trimesh, merge_digits: int = 8) -> trimesh.Trimesh:
+    """
+    Merge coincident vertices and drop degenerate, duplicate and unreferenced
+    geometry in one pass.
+
+    Duplicate faces are matched with their winding, so the two sides of a
+    double-sided mesh survive. A mesh with nothing to remove is returned
+    as-is, keeping the adjacency and normal caches trimesh already built.
+    """
+    vertices = np.asarray(mesh.vertices)
+    faces = np.asarray(mesh.faces)
+    face_count = len(faces)
+    if face_count == 0:
+        return mesh
+    
+    # Coincident vertices (equal to merge_digits decimals) share a row hash
+    first_vertex, vertex_map = trimesh.grouping.unique_rows(vertices, digits=merge_digits)
+    faces = vertex_map.reshape(-1)[faces]
+    
+    # Triangles that collapsed onto an edge or a point
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])]
+    
+    _, first_face = np.unique(_face_keys(canonical_face_rotation(faces), len(first_vertex)),
+                              return_index=True)
+    first_face.sort()
+    faces = faces[first_face]
+    
+    # Keep only referenced vertices, renumbered in order
+    used = np.zeros(len(first_vertex), dtype=bool)
+    used[faces] = True
+    if used.all() and len(first_vertex) == len(vertices) and len(faces) == face_count:
+        return mesh
+    faces = (np.cumsum(used) - 1)[faces]
+    source = first_vertex[used]
+    
+    vertex_colors = None
+    if getattr(mesh.visual, 'kind', None) == 'vertex':
+        vertex_colors = np.asarray(mesh.visual.vertex_colors)[source]
+    
+    return trimesh.Trimesh(vertices=vertices[source], faces=faces,
+                           vertex_colors=vertex_colors, process=False)
+
+
+def unify_and_dedup(faces: np.ndarray) -> np.ndarray:
+    """
+    Indices of the faces to keep so every triangle appears once, whatever
+    its winding.
+
+    One np.unique over packed sorted index triples finds exact duplicates and
+    reversed twins together; the first face of each group is kept, in order.
+    """
+    faces = np.asarray(faces)
+    _, first = np.unique(_face_keys(np.sort(faces, axis=1)), return_index=True)
+    first.sort()
+    return first
+
+
+# Faces sampled to estimate the outward ratio on large meshes
+OUTWARD_SAMPLE_SIZE = 10_000
+
+
+def count_outward_faces(vertices: np.ndarray, faces: np.ndarray, center: np.ndarray) -> int:
+    """Number of faces whose normal points away from ``center``"""
+    # Only the sign of each dot product matters, so float32 coordinates
+    # relative to the center are precise enough at half the bandwidth.
+    # Convert the vertices or the gathered corners, whichever is smaller.
+    if 3 * len(faces) < len(vertices):
+        triangles = (vertices[faces] - center).astype(np.float32)
+    else:
+        triangles = (vertices - center).astype(np.float32)[faces]
+    
+    # Normals straight from the gathered corners rather than trimesh's
+    # cached face_normals, which would gather them again. Summing the
+    # corners points the same way as their mean, and normalising wouldn't
+    # change any sign, so neither is done.
+    face_normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    center_to_face = triangles.sum(axis=1)
+    del triangles
+    
+    # Dot product tells us if normal points away from center
+    dot_products = np.einsum('ij,ij->i', face_normals, center_to_face)
+    return int(np.count_nonzero(dot_products > 0))
+
+
+def is_closed_and_outward(mesh: trimesh.Trimesh) -> bool:
+    """
+    Cheap check that a mesh already faces outward everywhere: watertight,
+    consistently wound and enclosing a positive volume. False when it can't
+    tell (open or non-manifold meshes).
+    """
+    try:
+        return bool(mesh.is_watertight and mesh.is_winding_consistent and mesh.volume > 0)
+    except Exception:
+        return False
+
+
 def fix_face_orientation_and_normals(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
     """
     Fix face orientation and normals so mesh is visible from all angles
@@ -64,67 +314,83 @@ def fix_face_orientation_and_normals(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
         original_face_count = len(mesh.faces)
         log(f"Starting face orientation fix with {original_face_count} faces")
         
-        # Step 1: Fix face winding/orientation
+        # Step 0: Merge vertices and drop bad faces. Meshes arrive unprocessed,
+        # and winding repair needs shared vertices to find neighbouring faces.
         try:
-            mesh.fix_normals()
-            log("Face normals fixed")
+            mesh = dedupe_mesh(mesh)
         except Exception as e:
-            log(f"Fix normals failed: {e}")
+            log(f"Mesh cleanup failed: {e}")
         
-        # Step 2: Ensure consistent face winding
+        # Step 1: Ensure consistent face winding. A face stored with both
+        # windings makes its edges non-manifold, so keep one of the pair and
+        # let fix_normals orient it; double-siding is decided in step 3.
+        faces_unique = False
         try:
-            mesh.unify_normals()
-            log("Face winding unified")  
+            keep = unify_and_dedup(mesh.faces)
+            if len(keep) < len(mesh.faces):
+                mesh.update_faces(keep)
+            faces_unique = True
+            log(f"Face winding unified ({len(mesh.faces)} unique triangles)")
         except Exception as e:
             log(f"Unify normals failed: {e}")
         
+        # Step 2: Fix face winding/orientation
+        try:
+            mesh.fix_normals()
+            log("Face normals fixed")
+        except Exception as e:
+            log(f"Fix normals failed: {e}")
+        
         # Step 3: Check if we need double-sided mesh
         try:
-            vertices = mesh.vertices.copy()
-            faces = mesh.faces.copy()
+            # Read-only views; flipping the winding below makes its own array
+            vertices = mesh.vertices
+            faces = mesh.faces
             
             # Check if mesh has consistent outward-facing normals
-            face_normals = mesh.face_normals
-            
-            if len(face_normals) > 0:
+            if is_closed_and_outward(mesh):
+                log("Mesh is closed with outward winding, no double-siding needed")
+            elif len(faces) > 0:
                 # Calculate center of mesh
                 center = vertices.mean(axis=0)
                 
-                # Check how many face normals point away from center
-                face_centers = vertices[faces].mean(axis=1)
-                center_to_face = face_centers - center
-                center_to_face = center_to_face / (np.linalg.norm(center_to_face, axis=1, keepdims=True) + 1e-8)
-                
-                # Dot product tells us if normal points away from center
-                dot_products = np.sum(face_normals * center_to_face, axis=1)
-                outward_faces = np.sum(dot_products > 0)
-                total_faces = len(dot_products)
+                # The ratio only feeds a yes/no decision, so estimate it from a
+                # sample and count every face only when it lands near the cut-off
+                sample = None
+                if len(faces) > OUTWARD_SAMPLE_SIZE:
+                    rng = np.random.default_rng(0)
+                    sample = rng.choice(len(faces), OUTWARD_SAMPLE_SIZE, replace=False)
+                    outward_faces = count_outward_faces(vertices, faces[sample], center)
+                    total_faces = OUTWARD_SAMPLE_SIZE
+                    if abs(outward_faces / total_faces - 0.6) < 0.05:
+                        sample = None
+                if sample is None:
+                    outward_faces = count_outward_faces(vertices, faces, center)
+                    total_faces = len(faces)
                 
                 outward_ratio = outward_faces / total_faces if total_faces > 0 else 0
-                log(f"Outward-facing faces: {outward_faces}/{total_faces} ({outward_ratio:.2f})")
+                sampled = " (sampled)" if sample is not None else ""
+                log(f"Outward-facing faces: {outward_faces}/{total_faces}{sampled} ({outward_ratio:.2f})")
                 
                 # If less than 60% of faces point outward, create double-sided mesh
                 if outward_ratio < 0.6:
                     log("Creating double-sided mesh for better visibility")
                     
-                    # Create flipped faces (reverse winding order)
-                    flipped_faces = faces[:, [0, 2, 1]]  # Reverse winding order
-                    
-                    # Combine original and flipped faces
-                    all_faces = np.vstack([faces, flipped_faces])
+                    # Original faces plus their reversed-winding twins. After step 1
+                    # no triangle appears twice in any winding, so no flip can
+                    # collide and the plain fill is enough.
+                    if faces_unique:
+                        all_faces = make_double_sided(faces)
+                    else:
+                        all_faces = build_double_sided(faces)
                     
                     # Create new mesh with double-sided faces
-                    double_sided_mesh = trimesh.Trimesh(vertices=vertices, faces=all_faces)
+                    double_sided_mesh = trimesh.Trimesh(vertices=vertices, faces=all_faces, process=False)
                     
                     # Transfer colors if they exist
                     if hasattr(mesh.visual, 'vertex_colors') and mesh.visual.vertex_colors is not None:
                         double_sided_mesh.visual.vertex_colors = mesh.visual.vertex_colors
                     
-                    # Basic cleanup of the double-sided mesh
-                    double_sided_mesh.remove_degenerate_faces()
-                    double_sided_mesh.remove_duplicate_faces()
-                    double_sided_mesh.remove_unreferenced_vertices()
-                    
                     log(f"Double-sided mesh created: {len(double_sided_mesh.faces)} faces")
                     return double_sided_mesh
                 else:
@@ -133,11 +399,6 @@ def fix_face_orientation_and_normals(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
         except Exception as e:
             log(f"Double-sided mesh creation failed: {e}")
         
-        # Step 4: Standard cleanup
-        mesh.remove_degenerate_faces()
-        mesh.remove_duplicate_faces()
-        mesh.remove_unreferenced_vertices()
-        
         final_face_count = len(mesh.faces)
         log(f"Face orientation fix completed: {original_face_count} -> {final_face_count} faces")
         return mesh
@@ -147,41 +408,165 @@ def fix_face_orientation_and_normals(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
         return mesh
 
 
-def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.ndarray] = None, 
-                                 smoothing_level: str = "medium") -> Optional[trimesh.Trimesh]:
-    """Precise Poisson reconstruction with better density filtering"""
-    if not HAS_OPEN3D:
-        return None
+# Above this many points the MST-based tangent-plane orientation takes
+# seconds; normals are pointed away from the centroid instead
+TANGENT_PLANE_MAX_POINTS = 300_000
+
+
+def orient_normals_outward(pcd, vertices: np.ndarray) -> None:
+    """Flip every normal that points towards the cloud's centroid (O(N))"""
+    normals = np.asarray(pcd.normals)
+    outward = vertices - vertices.mean(axis=0)
+    inward = np.einsum('ij,ij->i', normals, outward) < 0
+    normals[inward] *= -1
+    pcd.normals = o3d.utility.Vector3dVector(normals)
+
+
+def _estimate_normals_tensor(vertices: np.ndarray, colors: Optional[np.ndarray], radius: float,
+                             consistent: bool = True):
+    """Hybrid-search normals with the tensor API; returns a legacy cloud for Poisson"""
+    point_dtype = np.float64 if vertices.dtype == np.float64 else np.float32
+    tpcd = o3d.t.geometry.PointCloud(o3d.core.Tensor(np.ascontiguousarray(vertices, dtype=point_dtype)))
+    if colors is not None:
+        tpcd.point.colors = o3d.core.Tensor(np.ascontiguousarray(colors, dtype=np.float32))
+    
+    tpcd.estimate_normals(max_nn=30, radius=float(radius))
+    if not consistent:
+        return tpcd.to_legacy(), False
     
     try:
-        log("Starting Poisson reconstruction")
-        
-        # Create point cloud
+        tpcd.orient_normals_consistent_tangent_plane(100)
+        return tpcd.to_legacy(), True
+    except Exception:
+        # Older Open3D has no tensor orientation; the legacy cloud does it
+        return tpcd.to_legacy(), False
+
+
+def estimate_point_cloud_normals(vertices: np.ndarray, colors: Optional[np.ndarray], radius: float):
+    """
+    Build an Open3D point cloud with estimated, consistently oriented normals.
+
+    Uses the tensor PointCloud when available (faster on CPU), otherwise the
+    legacy one. Large clouds skip the tangent-plane orientation for a much
+    cheaper outward flip, which can get deep concavities wrong.
+    """
+    consistent = len(vertices) <= TANGENT_PLANE_MAX_POINTS
+    pcd = None
+    oriented = False
+    try:
+        pcd, oriented = _estimate_normals_tensor(vertices, colors, radius, consistent)
+    except Exception as e:
+        log(f"Tensor normal estimation unavailable ({e}), using legacy point cloud")
+    
+    if pcd is None:
         pcd = o3d.geometry.PointCloud()
         pcd.points = o3d.utility.Vector3dVector(vertices)
         
         if colors is not None:
             pcd.colors = o3d.utility.Vector3dVector(colors)
         
-        # Better normal estimation with consistent orientation
-        bbox = vertices.max(axis=0) - vertices.min(axis=0)
-        radius = max(np.linalg.norm(bbox) * 0.02, 0.001)
-        
         pcd.estimate_normals(
             search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=radius, max_nn=30)
         )
         pcd.normalize_normals()
-        
-        # Improved normal orientation for better surface generation
+    
+    if oriented:
+        return pcd
+    
+    if not consistent:
+        try:
+            orient_normals_outward(pcd, vertices)
+            log(f"Oriented normals away from centroid ({len(vertices)} points)")
+            return pcd
+        except Exception as e:
+            log(f"Outward normal orientation failed: {e}")
+    
+    # Improved normal orientation for better surface generation
+    try:
+        # Try to orient normals consistently toward outside
+        pcd.orient_normals_consistent_tangent_plane(100)
+    except:
         try:
-            # Try to orient normals consistently toward outside
-            pcd.orient_normals_consistent_tangent_plane(100)
+            # Fallback: orient toward camera/viewpoint
+            pcd.orient_normals_to_align_with_direction()
         except:
-            try:
-                # Fallback: orient toward camera/viewpoint
-                pcd.orient_normals_to_align_with_direction()
-            except:
-                log("Normal orientation failed, using estimated normals as-is")
+            log("Normal orientation failed, using estimated normals as-is")
+    
+    return pcd
+
+
+@lru_cache(maxsize=1)
+def _poisson_parameters() -> frozenset:
+    """Keyword arguments this Open3D build accepts for Poisson reconstruction"""
+    poisson = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson
+    try:
+        return frozenset(inspect.signature(poisson).parameters)
+    except (TypeError, ValueError):
+        # pybind11 functions have no signature; their docstring carries one
+        return frozenset(re.findall(r'(\w+)\s*:', (poisson.__doc__ or '').split('\n', 1)[0]))
+
+
+def poisson_tuning_options(point_count: int, smoothing_level: str) -> Dict[str, Any]:
+    """Extra Poisson options, limited to the ones this Open3D build supports"""
+    options = {
+        'n_threads': -1,  # all cores
+        # More samples per octree leaf means fewer leaves on dense scans
+        'samples_per_node': 1.5 if point_count > 5_000_000 else 3.0
+    }
+    if smoothing_level == 'light':
+        options['full_depth'] = 4
+    
+    supported = _poisson_parameters()
+    return {name: value for name, value in options.items() if name in supported}
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _density_statistics_numba(x):
+        # Welford's update: mean, variance and minimum in one pass
+        mean = 0.0
+        m2 = 0.0
+        low = x[0]
+        for i in range(x.shape[0]):
+            v = x[i]
+            delta = v - mean
+            mean += delta / (i + 1)
+            m2 += delta * (v - mean)
+            if v < low:
+                low = v
+        return mean, np.sqrt(m2 / x.shape[0]), low
+
+
+def density_statistics(densities: np.ndarray):
+    """Mean, standard deviation and minimum of the Poisson densities"""
+    densities = np.ascontiguousarray(densities, dtype=np.float64)
+    if HAS_NUMBA:
+        try:
+            return _density_statistics_numba(densities)
+        except Exception as e:
+            log(f"Numba density statistics failed ({e}), using NumPy")
+    
+    # Sum and sum of squares need no centred temporary, unlike np.std
+    n = len(densities)
+    mean = densities.sum() / n
+    variance = max(float(np.dot(densities, densities)) / n - mean * mean, 0.0)
+    return mean, np.sqrt(variance), densities.min()
+
+
+def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.ndarray] = None, 
+                                 smoothing_level: str = "medium") -> Optional[trimesh.Trimesh]:
+    """Precise Poisson reconstruction with better density filtering"""
+    if not HAS_OPEN3D:
+        return None
+    
+    try:
+        log("Starting Poisson reconstruction")
+        
+        # Better normal estimation with consistent orientation
+        bbox = vertices.max(axis=0) - vertices.min(axis=0)
+        radius = max(np.linalg.norm(bbox) * 0.02, 0.001)
+        
+        pcd = estimate_point_cloud_normals(vertices, colors, radius)
         
         # Precise Poisson parameters
         depth_map = {
@@ -193,12 +578,15 @@ def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.nda
         depth = depth_map.get(smoothing_level, 9)
         
         # Standard reconstruction parameters
+        tuning = poisson_tuning_options(len(vertices), smoothing_level)
+        log(f"Poisson depth={depth}, tuning={tuning}")
         mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
             pcd, 
             depth=depth,
             width=0,
             scale=1.1,
-            linear_fit=False
+            linear_fit=False,
+            **tuning
         )
         
         # IMPROVED density filtering - this is the key fix
@@ -206,12 +594,11 @@ def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.nda
             densities = np.asarray(densities)
             
             # Use statistical approach instead of fixed percentile
-            mean_density = np.mean(densities)
-            std_density = np.std(densities)
+            mean_density, std_density, min_density = density_statistics(densities)
             
             # Remove vertices that are more than 2 standard deviations below mean
             # This is much more precise than percentile-based filtering
-            thresh = max(mean_density - 2 * std_density, np.min(densities) * 1.1)
+            thresh = max(mean_density - 2 * std_density, min_density * 1.1)
             
             vertices_to_remove = densities < thresh
             removed_count = np.sum(vertices_to_remove)
@@ -241,7 +628,8 @@ def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.nda
         faces_np = np.asarray(mesh.triangles)
         
         if len(vertices_np) > 0 and len(faces_np) > 0:
-            tm = trimesh.Trimesh(vertices=vertices_np, faces=faces_np)
+            # Open3D has already removed duplicates; don't merge again
+            tm = trimesh.Trimesh(vertices=vertices_np, faces=faces_np, process=False, validate=False)
             
             # Transfer colors if available
             if mesh.has_vertex_colors():
@@ -261,6 +649,115 @@ def precise_poisson_reconstruction(vertices: np.ndarray, colors: Optional[np.nda
         return None
 
 
+def nearest_point_indices(points: np.ndarray, queries: np.ndarray,
+                          max_block_elements: int = 16 * 1024 * 1024) -> np.ndarray:
+    """
+    Index of the closest point for every query, without scipy.
+
+    Squared distances are expanded as |p|^2 - 2 p.q + |q|^2 so each block of
+    queries costs one matrix product. Queries are processed in blocks small
+    enough to keep the distance matrix under ``max_block_elements`` entries.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    queries = np.asarray(queries, dtype=np.float64)
+    indices = np.empty(len(queries), dtype=np.intp)
+    
+    p2 = np.einsum('ij,ij->i', points, points)
+    block = max(1, max_block_elements // max(len(points), 1))
+    for start in range(0, len(queries), block):
+        q = queries[start:start + block]
+        # |q|^2 is constant per column, so it doesn't change the argmin
+        d2 = points @ q.T
+        d2 *= -2.0
+        d2 += p2[:, None]
+        indices[start:start + block] = d2.argmin(axis=0)
+    
+    return indices
+
+
+def grid_nearest_indices(points: np.ndarray, queries: np.ndarray, cells_per_axis: int = 256,
+                         max_pairs: int = 2_000_000) -> np.ndarray:
+    """
+    Approximate nearest point for every query using a uniform spatial hash.
+
+    Points are bucketed into a grid once; each query only looks at the 27
+    cells around it. The hit is the closest point in that neighbourhood,
+    which is exact unless a closer point sits just beyond it. Queries
+    with no points nearby fall back to nearest_point_indices, as do queries
+    in crowded neighbourhoods once the grid has compared ``max_pairs``
+    (query, point) pairs; a clustered scan with a far outlier puts almost
+    every point in one cell.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    queries = np.asarray(queries, dtype=np.float64)
+    
+    origin = points.min(axis=0)
+    cell = float((points.max(axis=0) - origin).max()) / cells_per_axis
+    if not cell > 0:
+        return nearest_point_indices(points, queries)
+    
+    point_cells = np.floor((points - origin) / cell).astype(np.int64)
+    dims = point_cells.max(axis=0) + 1
+    
+    def pack(cells):
+        return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    
+    point_keys = pack(point_cells)
+    order = np.argsort(point_keys, kind='stable')
+    sorted_keys = point_keys[order]
+    del point_cells, point_keys
+    
+    query_cells = np.floor((queries - origin) / cell).astype(np.int64)
+    best_index = np.full(len(queries), -1, dtype=np.intp)
+    best_d2 = np.full(len(queries), np.inf)
+    
+    # Candidate ranges of every neighbouring cell, before touching any point
+    ranges = []
+    for offset in np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1])).T.reshape(-1, 3):
+        neighbour = query_cells + offset
+        valid = np.all((neighbour >= 0) & (neighbour < dims), axis=1)
+        keys = pack(np.where(valid[:, None], neighbour, 0))
+        lo = np.searchsorted(sorted_keys, keys, side='left')
+        hi = np.searchsorted(sorted_keys, keys, side='right')
+        ranges.append((lo, np.where(valid, hi - lo, 0)))
+    
+    # Cheapest queries first, until the pair budget runs out. A neighbourhood
+    # holding a large share of the cloud is no better than the brute-force
+    # search, so it goes there regardless.
+    cost = np.sum([counts for _, counts in ranges], axis=0)
+    by_cost = np.argsort(cost, kind='stable')
+    use_grid = np.zeros(len(queries), dtype=bool)
+    use_grid[by_cost[np.cumsum(cost[by_cost]) <= max_pairs]] = True
+    use_grid &= cost <= len(points) // 8
+    
+    for lo, counts in ranges:
+        counts = np.where(use_grid, counts, 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        
+        # Flatten every (query, candidate) pair in this cell
+        query_index = np.repeat(np.arange(len(queries)), counts)
+        run_start = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        candidate = order[run_start + np.arange(total)]
+        diff = points[candidate] - queries[query_index]
+        d2 = np.einsum('ij,ij->i', diff, diff)
+        
+        # Closest candidate per query, then keep it if it beats the best so far
+        by_query = np.lexsort((d2, query_index))
+        first = by_query[np.r_[True, query_index[by_query][1:] != query_index[by_query][:-1]]]
+        improved = d2[first] < best_d2[query_index[first]]
+        winners = first[improved]
+        best_d2[query_index[winners]] = d2[winners]
+        best_index[query_index[winners]] = candidate[winners]
+    
+    missing = best_index < 0
+    if np.any(missing):
+        best_index[missing] = nearest_point_indices(points, queries[missing])
+    
+    return best_index
+
+
 def create_mesh_from_points_basic(points: np.ndarray, colors: Optional[np.ndarray] = None) -> trimesh.Trimesh:
     """
     Create a basic mesh from points using simple triangulation
@@ -278,12 +775,7 @@ def create_mesh_from_points_basic(points: np.ndarray, colors: Optional[np.ndarra
                 mesh_colors = colors[indices]
             else:
                 # Simple closest point mapping without scipy
-                mesh_colors = []
-                for mv in mesh_vertices:
-                    dists = np.sum((points - mv)**2, axis=1)
-                    closest_idx = np.argmin(dists)
-                    mesh_colors.append(colors[closest_idx])
-                mesh_colors = np.array(mesh_colors)
+                mesh_colors = colors[grid_nearest_indices(points, mesh_vertices)]
             
             # Set vertex colors
             if mesh_colors.max() <= 1.0:
@@ -299,70 +791,118 @@ def create_mesh_from_points_basic(points: np.ndarray, colors: Optional[np.ndarra
         return trimesh.creation.box(extents=[1, 1, 1])
 
 
+def stack_face_indices(vertex_indices: np.ndarray) -> np.ndarray:
+    """
+    Turn plyfile's per-face index lists into an (n, 3) triangle array.
+
+    Triangle-only meshes are stacked in one call; polygons are fan-triangulated.
+    """
+    lengths = np.fromiter(map(len, vertex_indices), dtype=np.intp, count=len(vertex_indices))
+    if len(lengths) == 0:
+        return np.empty((0, 3), dtype=np.int32)
+    if np.all(lengths == 3):
+        return np.stack(vertex_indices).astype(np.int32, copy=False)
+    
+    faces = np.empty((int(np.sum(np.maximum(lengths - 2, 0))), 3), dtype=np.int32)
+    row = 0
+    for polygon in vertex_indices:
+        for i in range(1, len(polygon) - 1):
+            faces[row] = (polygon[0], polygon[i], polygon[i + 1])
+            row += 1
+    return faces
+
+
+def _ply_arrays(vertices: np.ndarray, faces: Optional[np.ndarray],
+                colors: Optional[np.ndarray]) -> Dict[str, Any]:
+    """Package loaded PLY data, with colors as float32"""
+    # Positions keep double precision when they have it (georeferenced scans
+    # need it); anything narrower is widened only as far as float32
+    if vertices.dtype != np.float64:
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+    if colors is not None:
+        colors = colors.astype(np.float32, copy=False)
+    
+    return {
+        'vertices': vertices,
+        'faces': faces,
+        'colors': colors,
+        'is_point_cloud': faces is None or len(faces) == 0
+    }
+
+
+def _load_ply_plyfile(file_path: str) -> Optional[Dict[str, Any]]:
+    """Read the PLY with plyfile, memory-mapping binary vertex data"""
+    plydata = PlyData.read(file_path, mmap=True)
+    vertices = plydata['vertex'].data
+    names = vertices.dtype.names
+    if not all(axis in names for axis in ('x', 'y', 'z')):
+        return None
+    
+    # Extract coordinates, in double precision only if the file stores them so
+    double = any(vertices.dtype[axis].itemsize >= 8 for axis in ('x', 'y', 'z'))
+    coords = np.empty((len(vertices), 3), dtype=np.float64 if double else np.float32)
+    for i, axis in enumerate(('x', 'y', 'z')):
+        coords[:, i] = vertices[axis]
+    
+    # Extract colors if available
+    colors = None
+    if 'red' in names and 'green' in names and 'blue' in names:
+        colors = np.column_stack([vertices['red'], vertices['green'], vertices['blue']])
+        if colors.max() > 1.0:
+            colors = colors.astype(np.float32) * np.float32(1 / 255)
+    
+    # Check for faces
+    faces = None
+    if 'face' in plydata:
+        face_data = plydata['face'].data
+        for name in ('vertex_indices', 'vertex_index'):
+            if name in face_data.dtype.names:
+                faces = stack_face_indices(face_data[name])
+                break
+    
+    return _ply_arrays(coords, faces, colors)
+
+
 def load_ply_file(file_path: str) -> Dict[str, Any]:
     """Load PLY file and extract vertices, colors, normals"""
     try:
-        # Try with trimesh first (most compatible)
-        mesh_data = trimesh.load(str(file_path))
-        
-        if hasattr(mesh_data, 'vertices'):
-            vertices = np.asarray(mesh_data.vertices)
-            
-            # Extract colors if available
-            colors = None
-            if hasattr(mesh_data.visual, 'vertex_colors'):
-                colors = np.asarray(mesh_data.visual.vertex_colors)
-                if colors.shape[1] == 4:  # RGBA to RGB
-                    colors = colors[:, :3]
-                if colors.max() > 1.0:  # Convert to 0-1 range
-                    colors = colors / 255.0
-            
-            # Extract faces if it's a mesh
-            faces = None
-            if hasattr(mesh_data, 'faces') and len(mesh_data.faces) > 0:
-                faces = np.asarray(mesh_data.faces)
-            
-            return {
-                'vertices': vertices,
-                'faces': faces,
-                'colors': colors,
-                'is_point_cloud': faces is None or len(faces) == 0
-            }
+        # plyfile first: no trimesh processing, and binary vertex data is mapped
+        # rather than parsed
+        ply_arrays = _load_ply_plyfile(file_path)
+        if ply_arrays is not None:
+            return ply_arrays
+        log("PLY has no x/y/z vertex properties, trying trimesh")
     
     except Exception as e:
-        log(f"Trimesh loading failed: {e}")
+        log(f"PLYfile loading failed: {e}")
     
     try:
-        # Fallback to plyfile
-        plydata = PlyData.read(file_path)
-        vertices = plydata['vertex']
+        # Fallback to trimesh (most compatible)
+        mesh_data = trimesh.load(str(file_path), process=False)
+        
+        if not hasattr(mesh_data, 'vertices'):
+            raise ValueError(f"no vertex data in {type(mesh_data).__name__}")
         
-        # Extract coordinates
-        coords = np.column_stack([vertices['x'], vertices['y'], vertices['z']])
+        vertices = np.asarray(mesh_data.vertices)
         
         # Extract colors if available
         colors = None
-        if 'red' in vertices.dtype.names and 'green' in vertices.dtype.names and 'blue' in vertices.dtype.names:
-            colors = np.column_stack([vertices['red'], vertices['green'], vertices['blue']])
-            if colors.max() > 1.0:
-                colors = colors / 255.0
+        if hasattr(mesh_data.visual, 'vertex_colors'):
+            colors = np.asarray(mesh_data.visual.vertex_colors)
+            if colors.shape[1] == 4:  # RGBA to RGB
+                colors = colors[:, :3]
+            if colors.max() > 1.0:  # Convert to 0-1 range
+                colors = colors.astype(np.float32) * np.float32(1 / 255)
         
-        # Check for faces
+        # Extract faces if it's a mesh
         faces = None
-        if 'face' in plydata:
-            face_data = plydata['face']
-            if 'vertex_indices' in face_data.dtype.names:
-                faces = np.array([list(face[0]) for face in face_data['vertex_indices']])
-        
-        return {
-            'vertices': coords,
-            'faces': faces,
-            'colors': colors,
-            'is_point_cloud': faces is None or len(faces) == 0
-        }
+        if hasattr(mesh_data, 'faces') and len(mesh_data.faces) > 0:
+            faces = np.asarray(mesh_data.faces)
+        
+        return _ply_arrays(vertices, faces, colors)
         
     except Exception as e:
-        log(f"PLYfile loading failed: {e}")
+        log(f"Trimesh loading failed: {e}")
         raise RuntimeError(f"Failed to load PLY file: {e}")
 
 
@@ -378,6 +918,16 @@ def smooth_mesh_basic(mesh: trimesh.Trimesh, smoothing_level: str = "medium") ->
         
         iterations = iterations_map.get(smoothing_level, 2)
         
+        try:
+            # Taubin smoothing builds the Laplacian once and alternates a
+            # shrinking and an inflating step, so the mesh keeps its volume.
+            # trimesh counts each step as an iteration; run whole pairs.
+            trimesh.smoothing.filter_taubin(mesh, lamb=0.5, nu=0.53, iterations=2 * iterations)
+            log(f"Applied Taubin smoothing: {iterations} iterations")
+            return mesh
+        except Exception as e:
+            log(f"Taubin smoothing unavailable ({e}), using smoothed()")
+        
         smoothed_mesh = mesh
         for i in range(iterations):
             if hasattr(smoothed_mesh, 'smoothed'):
@@ -393,12 +943,136 @@ def smooth_mesh_basic(mesh: trimesh.Trimesh, smoothing_level: str = "medium") ->
         return mesh
 
 
+# Mesh rebuilt once per export worker process by _init_export_worker
+_export_mesh: Optional[trimesh.Trimesh] = None
+
+
+def _init_export_worker(vertices: np.ndarray, faces: np.ndarray,
+                        vertex_colors: Optional[np.ndarray]) -> None:
+    """Rebuild the mesh in an export worker (inherited without pickling under fork)"""
+    global _export_mesh
+    _export_mesh = trimesh.Trimesh(vertices=vertices, faces=faces,
+                                   vertex_colors=vertex_colors, process=False)
+
+
+def write_mesh_atomic(mesh: trimesh.Trimesh, file_path: str) -> str:
+    """
+    Export the mesh to a temporary sibling and rename it into place.
+
+    The format follows the file extension. The final path only ever holds a
+    complete file, so nothing half-written can be served.
+    """
+    file_type = Path(file_path).suffix[1:]
+    options = {}
+    if file_type == 'obj':
+        # Don't write per-vertex colors for a mesh that has none
+        options['include_color'] = getattr(mesh.visual, 'kind', None) == 'vertex'
+    
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as fh:
+            mesh.export(file_obj=fh, file_type=file_type, **options)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return file_path
+
+
+def _export_context():
+    """
+    Start method for export workers: fork where available, so the mesh
+    arrays in initargs are inherited rather than pickled to every worker
+    (newer Pythons no longer default to fork on Linux).
+    """
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def _export_one(file_path: str) -> str:
+    """Export the worker's mesh"""
+    return write_mesh_atomic(_export_mesh, file_path)
+
+
+def export_mesh_formats(mesh: trimesh.Trimesh, output_path: Path, output_formats: list,
+                        conversion_id: str, update_progress: Callable[[str, int], None],
+                        max_workers: Optional[int] = None) -> Dict[str, str]:
+    """
+    Export the mesh to every requested format.
+
+    Writers are independent and CPU-bound, so with several formats they run in
+    parallel worker processes. Falls back to a serial loop if a process pool
+    can't be used.
+    """
+    targets = {fmt: str(output_path / f"{conversion_id}_smooth.{fmt}") for fmt in output_formats}
+    total = len(targets)
+    results = {}
+    failed = set()
+    
+    def record(fmt: str, file_path: Optional[str], error: Optional[Exception]) -> None:
+        if error is None:
+            results[fmt] = file_path
+            log(f"Exported {fmt.upper()}: {file_path}")
+            outcome = "Exported"
+        else:
+            failed.add(fmt)
+            log(f"Failed to export {fmt}: {error}")
+            outcome = "Failed"
+        done = len(results) + len(failed)
+        update_progress(f"{outcome} {fmt.upper()} ({done}/{total})", 80 + int(done / total * 15))
+    
+    # max_workers is this conversion's share of the cores when several run at once
+    workers = min(total, max_workers or os.cpu_count() or 1)
+    if workers > 1:
+        vertex_colors = None
+        if getattr(mesh.visual, 'kind', None) == 'vertex':
+            vertex_colors = np.asarray(mesh.visual.vertex_colors)
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_export_context(),
+                initializer=_init_export_worker,
+                initargs=(np.asarray(mesh.vertices), np.asarray(mesh.faces), vertex_colors)
+            ) as pool:
+                futures = {pool.submit(_export_one, file_path): fmt for fmt, file_path in targets.items()}
+                for future in as_completed(futures):
+                    fmt = futures[future]
+                    try:
+                        record(fmt, future.result(), None)
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as export_error:
+                        record(fmt, None, export_error)
+            return results
+        except Exception as pool_error:
+            log(f"Parallel export unavailable ({pool_error}), exporting serially")
+    
+    for fmt, file_path in targets.items():
+        if fmt in results or fmt in failed:
+            continue
+        done = len(results) + len(failed)
+        update_progress(f"Exporting {fmt.upper()}...", 80 + int(done / total * 15))
+        try:
+            record(fmt, write_mesh_atomic(mesh, file_path), None)
+        except Exception as export_error:
+            record(fmt, None, export_error)
+    
+    return results
+
+
 class PLYConverter:
     """Fixed PLY Converter with 360° visibility"""
     
     def convert_ply(self, input_path: str, output_dir: str, output_formats: list, 
                    conversion_id: str, progress_callback: Optional[Callable] = None, 
-                   smoothing_level: str = "medium") -> Dict[str, str]:
+                   smoothing_level: str = "medium", export_workers: Optional[int] = None) -> Dict[str, str]:
         """Convert PLY file to specified formats with face orientation fixes"""
         
         def update_progress(message: str, progress: int):
@@ -432,13 +1106,18 @@ class PLYConverter:
             else:
                 update_progress("Mesh detected, preserving original geometry...", 25)
                 # Create trimesh from existing mesh data
-                mesh = trimesh.Trimesh(vertices=vertices, faces=faces)
+                # Cleanup happens once, in fix_face_orientation_and_normals
+                mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
                 if colors is not None:
                     if colors.max() <= 1.0:
                         colors = (colors * 255).astype(np.uint8)
                     mesh.visual.vertex_colors = colors
                 update_progress("Original mesh loaded", 40)
             
+            # The mesh owns its own buffers now; release the raw PLY arrays so
+            # they don't stay resident through cleanup, smoothing and export
+            del ply_data, vertices, faces, colors
+            
             update_progress("Fixing face orientation for 360° visibility...", 55)
             
             # Fix face orientation and normals so mesh is visible from all angles
@@ -448,42 +1127,27 @@ class PLYConverter:
             
             # Apply smoothing only for existing meshes, not point cloud reconstructions
             if not is_point_cloud:
-                mesh = smooth_mesh_basic(mesh, smoothing_level)
-            
-            update_progress("Final cleanup...", 75)
-            
-            # Final minimal cleanup
-            try:
-                mesh.remove_degenerate_faces()
-                mesh.remove_duplicate_faces()
-                mesh.remove_unreferenced_vertices()
-            except Exception as e:
-                log(f"Final cleanup warning: {e}")
+                smoothed_mesh = smooth_mesh_basic(mesh, smoothing_level)
+                
+                # Taubin smoothing works in place and leaves the topology alone.
+                # A new mesh comes from the smoothed() fallback, which splits
+                # vertices along creases; only that one needs welding again.
+                if smoothed_mesh is not mesh:
+                    update_progress("Final cleanup...", 75)
+                    try:
+                        smoothed_mesh = dedupe_mesh(smoothed_mesh)
+                    except Exception as e:
+                        log(f"Final cleanup warning: {e}")
+                mesh = smoothed_mesh
             
             update_progress("Exporting files...", 80)
             
             # Export to specified formats
-            results = {}
             output_path = Path(output_dir)
             output_path.mkdir(parents=True, exist_ok=True)
             
-            for i, fmt in enumerate(output_formats):
-                try:
-                    progress = 80 + int((i + 1) / len(output_formats) * 15)
-                    update_progress(f"Exporting {fmt.upper()}...", progress)
-                    
-                    filename = f"{conversion_id}_smooth.{fmt}"
-                    file_path = output_path / filename
-                    
-                    # Export based on format
-                    mesh.export(str(file_path))
-                    results[fmt] = str(file_path)
-                    
-                    log(f"Exported {fmt.upper()}: {file_path}")
-                    
-                except Exception as export_error:
-                    log(f"Failed to export {fmt}: {export_error}")
-                    continue
+            results = export_mesh_formats(mesh, output_path, output_formats,
+                                          conversion_id, update_progress, export_workers)
             
             if not results:
                 raise RuntimeError("No files were successfully exported")
@@ -499,6 +1163,36 @@ class PLYConverter:
             raise RuntimeError(error_msg) from e
 
 
+# Progress queue back to the web process, set by init_conversion_worker
+_progress_queue = None
+
+
+def init_conversion_worker(progress_queue) -> None:
+    """Initializer for conversion worker processes"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def run_conversion(input_path: str, output_dir: str, output_formats: list,
+                   conversion_id: str, smoothing_level: str = "medium",
+                   export_workers: Optional[int] = None) -> Dict[str, str]:
+    """Run a conversion inside a worker process, reporting progress through the shared queue"""
+    def progress_callback(message: str, progress: Optional[int] = None) -> None:
+        if _progress_queue is not None:
+            _progress_queue.put((conversion_id, message, progress))
+    
+    converter = PLYConverter()
+    try:
+        return converter.convert_ply(input_path, output_dir, output_formats, conversion_id,
+                                     progress_callback, smoothing_level=smoothing_level,
+                                     export_workers=export_workers)
+    finally:
+        # Worker processes are reused; trimesh caches hold reference cycles, so
+        # collect now rather than carrying this job's mesh into the next one
+        del converter
+        gc.collect()
+
+
 def main():
     """Simple test function"""
     print("PLY Converter - Fixed Version with 360° Visibility")
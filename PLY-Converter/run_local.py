@@ -21,9 +21,14 @@ if __name__ == '__main__':
     print("Open your browser and go to: http://localhost:5000")
     print("Press Ctrl+C to stop the server")
     
-    # Run the Flask app
-    app.run(
-        host='0.0.0.0',
-        port=5001,
-        debug=True
-    )
\ No newline at end of file
+    if os.environ.get('PLY_CONVERTER_SERVER') == 'uvicorn':
+        # Async serving path: progress endpoints run on the event loop
+        import uvicorn
+        uvicorn.run('asgi:application', host='0.0.0.0', port=5001, workers=1)
+    else:
+        # Run the Flask app
+        app.run(
+            host='0.0.0.0',
+            port=5001,
+            debug=True
+        )
\ No newline at end of file
@@ -12,6 +12,7 @@ class PLYSmoothConverter {
         this.currentFile = null;
         this.conversionId = null;
         this.progressInterval = null;
+        this.progressSource = null;
         this.progressRetries = 0;
         this.maxRetries = 3;
         
@@ -97,7 +98,7 @@ class PLYSmoothConverter {
                 <div class="upload-content">
                     <i class="fas fa-file-alt upload-icon mb-3"></i>
                     <h5>File Selected for Smoothing</h5>
-                    <p class="text-muted mb-2">${this.currentFile.name}</p>
+                    <p class="text-muted mb-2">${this.escapeHtml(this.currentFile.name)}</p>
                     <p class="small text-muted">${this.formatFileSize(this.currentFile.size)}</p>
                     <button type="button" class="btn btn-outline-secondary btn-sm mt-2">
                         <i class="fas fa-times me-1"></i>Change File
@@ -203,14 +204,14 @@ class PLYSmoothConverter {
             // Update file info
             const smoothingDisplayText = this.getSmoothingDisplayText(result.smoothing_level);
             document.getElementById('fileInfo').innerHTML = `
-                <strong>File:</strong> ${result.input_file}<br>
+                <strong>File:</strong> ${this.escapeHtml(result.input_file)}<br>
                 <strong>Smoothing Level:</strong> ${smoothingDisplayText} (${result.smoothing_level})<br>
                 <strong>Output Formats:</strong> ${result.output_formats.join(', ').toUpperCase()}<br>
                 <strong>Conversion ID:</strong> ${result.conversion_id}
             `;
             
-            // Start progress polling
-            this.startProgressPolling();
+            // Start progress updates
+            this.startProgressUpdates();
             
         } catch (error) {
             console.error('Conversion start error:', error);
@@ -219,6 +220,43 @@ class PLYSmoothConverter {
         }
     }
     
+    startProgressUpdates() {
+        // Prefer server-pushed events; fall back to polling where unsupported
+        if (window.EventSource) {
+            this.startProgressStream();
+        } else {
+            this.startProgressPolling();
+        }
+    }
+    
+    startProgressStream() {
+        console.log('Opening progress stream for:', this.conversionId);
+        this.progressSource = new EventSource(`/progress-stream/${this.conversionId}`);
+        
+        this.progressSource.onmessage = (event) => {
+            this.handleProgress(JSON.parse(event.data));
+        };
+        
+        this.progressSource.onerror = () => {
+            console.warn('Progress stream failed, falling back to polling');
+            this.stopProgressUpdates();
+            if (this.conversionId) {
+                this.startProgressPolling();
+            }
+        };
+    }
+    
+    stopProgressUpdates() {
+        if (this.progressInterval) {
+            clearInterval(this.progressInterval);
+            this.progressInterval = null;
+        }
+        if (this.progressSource) {
+            this.progressSource.close();
+            this.progressSource = null;
+        }
+    }
+    
     startProgressPolling() {
         console.log('Starting progress polling for:', this.conversionId);
         this.progressInterval = setInterval(() => {
@@ -253,39 +291,7 @@ class PLYSmoothConverter {
             // Reset retry counter on successful fetch
             this.progressRetries = 0;
             
-            // Update progress bar
-            const progressBar = document.getElementById('progressBar');
-            const progressPercent = document.getElementById('progressPercent');
-            const progressMessage = document.getElementById('progressMessage');
-            
-            const progressValue = Math.max(0, Math.min(100, progress.progress || 0));
-            
-            progressBar.style.width = `${progressValue}%`;
-            progressBar.setAttribute('aria-valuenow', progressValue);
-            progressPercent.textContent = `${progressValue}%`;
-            progressMessage.textContent = progress.message || 'Processing smooth surface...';
-            
-            // Update progress bar color based on stage
-            progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated';
-            if (progressValue >= 80) {
-                progressBar.classList.add('bg-success');
-            } else if (progressValue >= 40) {
-                progressBar.classList.add('bg-warning');
-            } else {
-                progressBar.classList.add('bg-info');
-            }
-            
-            // Check if completed
-            if (progress.status === 'completed') {
-                console.log('Conversion completed!');
-                clearInterval(this.progressInterval);
-                this.showResults(progress);
-            } else if (progress.status === 'error') {
-                console.error('Conversion failed:', progress.message);
-                clearInterval(this.progressInterval);
-                this.hideProgress();
-                this.showError(progress.message || 'Conversion failed');
-            }
+            this.handleProgress(progress);
             
         } catch (error) {
             console.error('Progress update error:', error);
@@ -293,7 +299,7 @@ class PLYSmoothConverter {
             
             if (this.progressRetries >= this.maxRetries) {
                 console.error('Max retries reached, stopping progress polling');
-                clearInterval(this.progressInterval);
+                this.stopProgressUpdates();
                 this.hideProgress();
                 this.showError(`Progress update failed after ${this.maxRetries} attempts: ${error.message}`);
             } else {
@@ -302,6 +308,42 @@ class PLYSmoothConverter {
         }
     }
     
+    handleProgress(progress) {
+        // Update progress bar
+        const progressBar = document.getElementById('progressBar');
+        const progressPercent = document.getElementById('progressPercent');
+        const progressMessage = document.getElementById('progressMessage');
+        
+        const progressValue = Math.max(0, Math.min(100, progress.progress || 0));
+        
+        progressBar.style.width = `${progressValue}%`;
+        progressBar.setAttribute('aria-valuenow', progressValue);
+        progressPercent.textContent = `${progressValue}%`;
+        progressMessage.textContent = progress.message || 'Processing smooth surface...';
+        
+        // Update progress bar color based on stage
+        progressBar.className = 'progress-bar progress-bar-striped progress-bar-animated';
+        if (progressValue >= 80) {
+            progressBar.classList.add('bg-success');
+        } else if (progressValue >= 40) {
+            progressBar.classList.add('bg-warning');
+        } else {
+            progressBar.classList.add('bg-info');
+        }
+        
+        // Check if completed
+        if (progress.status === 'completed') {
+            console.log('Conversion completed!');
+            this.stopProgressUpdates();
+            this.showResults(progress);
+        } else if (progress.status === 'error') {
+            console.error('Conversion failed:', progress.message);
+            this.stopProgressUpdates();
+            this.hideProgress();
+            this.showError(progress.message || 'Conversion failed');
+        }
+    }
+    
     showResults(progress) {
         this.hideProgress();
         
@@ -372,10 +414,7 @@ class PLYSmoothConverter {
     
     hideProgress() {
         this.progressCard.style.display = 'none';
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
-            this.progressInterval = null;
-        }
+        this.stopProgressUpdates();
     }
     
     showError(message) {
@@ -444,6 +483,12 @@ class PLYSmoothConverter {
         
         return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
     }
+    
+    escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
 }
 
 // Initialize the converter when the page loads
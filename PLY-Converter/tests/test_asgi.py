@@ -0,0 +1,82 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('asgiref')
+
+import app as ply_app
+from asgi import application
+
+
+def _call(path, updates=()):
+    """Drive a GET request through the ASGI app, publishing ``updates`` once it starts"""
+    messages = []
+
+    async def run():
+        disconnected = asyncio.Event()
+        requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.start':
+                loop = asyncio.get_running_loop()
+                for fields in updates:
+                    loop.call_later(0.01, lambda f=fields: ply_app.publish_progress('job', **f))
+
+        scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': [],
+                 'root_path': '', 'server': ('testserver', 80)}
+        await asyncio.wait_for(application(scope, receive, send), timeout=5)
+        disconnected.set()
+
+    asyncio.run(run())
+    status = messages[0]['status']
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return status, body
+
+
+@pytest.fixture
+def job():
+    ply_app.conversion_progress['job'] = {
+        'status': 'processing', 'progress': 10, 'message': 'Loading', 'created_at': time.time(),
+    }
+    yield
+    ply_app.discard_conversion('job')
+
+
+def test_progress_unknown_conversion():
+    status, body = _call('/progress/missing')
+    assert status == 404
+    assert json.loads(body) == {'error': 'Conversion not found'}
+
+
+def test_progress_snapshot(job):
+    status, body = _call('/progress/job')
+    assert status == 200
+    assert json.loads(body)['progress'] == 10
+
+
+def test_progress_stream_ends_on_terminal_status(job):
+    status, body = _call('/progress-stream/job', updates=[
+        {'progress': 50, 'message': 'Smoothing'},
+        {'status': 'completed', 'progress': 100, 'message': 'Done'},
+    ])
+    assert status == 200
+    events = [json.loads(chunk[len('data: '):]) for chunk in body.decode().split('\n\n') if chunk]
+    assert [e['progress'] for e in events] == [10, 50, 100]
+    assert events[-1]['status'] == 'completed'
+    assert 'job' not in ply_app.progress_listeners
+
+
+def test_other_routes_fall_through_to_flask():
+    status, body = _call('/status')
+    assert status == 200
+    assert 'upload_folder' in json.loads(body)
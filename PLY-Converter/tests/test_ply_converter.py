@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+trimesh = pytest.importorskip('trimesh')
+
+import ply_converter
+
+
+def _faces_with_duplicates_and_twins():
+    faces = trimesh.creation.icosphere(subdivisions=1).faces
+    # An exact duplicate, a rotated duplicate and a reversed twin
+    extra = np.array([faces[0], np.roll(faces[1], 1), faces[2][[0, 2, 1]]])
+    return np.concatenate([faces, extra])
+
+
+@pytest.mark.skipif(not ply_converter.HAS_NUMBA, reason='numba not installed')
+def test_build_double_sided_numba_matches_numpy():
+    faces = _faces_with_duplicates_and_twins()
+    expected = ply_converter._build_double_sided_numpy(faces)
+    result = ply_converter._build_double_sided_numba(np.ascontiguousarray(faces))
+    np.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.skipif(not ply_converter.HAS_NUMBA, reason='numba not installed')
+def test_make_double_sided_numba_matches_numpy():
+    faces = _faces_with_duplicates_and_twins()
+    expected = np.concatenate([faces, faces[:, [0, 2, 1]]])
+    np.testing.assert_array_equal(ply_converter._make_double_sided_numba(faces), expected)
+
+
+def test_dedupe_mesh_returns_clean_mesh_unchanged():
+    mesh = trimesh.creation.icosphere(subdivisions=2)
+    assert ply_converter.dedupe_mesh(mesh) is mesh
+
+
+def test_dedupe_mesh_keeps_twins_and_drops_duplicates():
+    mesh = trimesh.creation.icosphere(subdivisions=1)
+    faces = _faces_with_duplicates_and_twins()
+    deduped = ply_converter.dedupe_mesh(trimesh.Trimesh(mesh.vertices, faces, process=False))
+    # The exact and rotated duplicates go; the reversed twin stays
+    assert len(deduped.faces) == len(mesh.faces) + 1
+
+
+def test_grid_nearest_indices_with_outlier():
+    rng = np.random.default_rng(0)
+    points = np.vstack([rng.normal(size=(5000, 3)), [[1000.0, 1000.0, 1000.0]]])
+    queries = points[rng.choice(len(points), 200, replace=False)]
+    expected = ply_converter.nearest_point_indices(points, queries)
+    np.testing.assert_array_equal(ply_converter.grid_nearest_indices(points, queries), expected)
@@ -0,0 +1,140 @@
+import io
+import struct
+
+import pytest
+
+pytest.importorskip('flask')
+
+import app as ply_app
+from app import UploadRejected, parse_ply_header, validate_ply_header
+
+
+def _binary_ply(vertex_count=3, face_count=1):
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {vertex_count}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {face_count}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    ).encode('ascii')
+    body = b''.join(struct.pack('<3f', i, i, i) for i in range(min(vertex_count, 3)))
+    body += struct.pack('<B3i', 3, 0, 1, 2)
+    return header + body
+
+
+ASCII_PLY = (
+    b"ply\n"
+    b"format ascii 1.0\n"
+    b"element vertex 3\n"
+    b"property float x\n"
+    b"property float y\n"
+    b"property float z\n"
+    b"end_header\n"
+    b"0 0 0\n1 0 0\n0 1 0\n"
+)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setitem(ply_app.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(ply_app.app.config, 'RAM_UPLOAD_FOLDER', None)
+    ply_app.app.config['TESTING'] = True
+    with ply_app.app.test_client() as client:
+        yield client
+
+
+def _upload(client, content, formats='nonexistent'):
+    return client.post('/upload', data={
+        'file': (io.BytesIO(content), 'scan.ply'),
+        'formats': formats
+    }, content_type='multipart/form-data')
+
+
+def test_parse_binary_header():
+    header = parse_ply_header(_binary_ply(vertex_count=10, face_count=4))
+    assert header['format'] == 'binary_little_endian'
+    assert header['vertex_count'] == 10
+    assert header['face_count'] == 4
+    assert header['data_bytes'] == 10 * 12 + 4 * 13
+
+
+def test_parse_ascii_header():
+    header = parse_ply_header(ASCII_PLY)
+    assert header['format'] == 'ascii'
+    assert header['vertex_count'] == 3
+    assert header['face_count'] == 0
+
+
+def test_rejects_bad_magic():
+    with pytest.raises(UploadRejected) as excinfo:
+        parse_ply_header(b"solid cube\nfacet normal 0 0 1\n")
+    assert excinfo.value.status_code == 400
+
+
+def test_rejects_unknown_format():
+    with pytest.raises(UploadRejected, match='Unsupported PLY format'):
+        parse_ply_header(b"ply\nformat binary_middle_endian 1.0\nelement vertex 1\n"
+                         b"property float x\nend_header\n")
+
+
+def test_rejects_truncated_header():
+    with pytest.raises(UploadRejected, match='incomplete'):
+        parse_ply_header(b"ply\nformat ascii 1.0\nelement vertex 3\nproperty float x\n")
+
+
+def test_rejects_oversized_declaration():
+    with pytest.raises(UploadRejected) as excinfo:
+        validate_ply_header(_binary_ply(vertex_count=10 ** 9))
+    assert excinfo.value.status_code == 413
+
+
+def test_upload_rejects_bad_magic(client, tmp_path):
+    response = _upload(client, b"not a ply file at all\n" * 10)
+    assert response.status_code == 400
+    assert 'PLY' in response.get_json()['error']
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_rejects_truncated_header(client, tmp_path):
+    response = _upload(client, b"ply\nformat ascii 1.0\nelement vertex 3\n")
+    assert response.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_rejects_header_without_end_within_limit(client, tmp_path):
+    content = b"ply\nformat ascii 1.0\n" + b"comment padding\n" * (ply_app.PLY_HEADER_LIMIT // 16 + 1)
+    response = _upload(client, content)
+    assert response.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_oversized_declaration_closes_connection(client, tmp_path):
+    response = _upload(client, _binary_ply(vertex_count=10 ** 9))
+    assert response.status_code == 413
+    assert response.headers['Connection'] == 'close'
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('content', [_binary_ply(), ASCII_PLY])
+def test_upload_accepts_valid_header(client, tmp_path, content):
+    # The header passes; the request then fails on its output formats, which
+    # happens after the upload was written and removes it again
+    response = _upload(client, content)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid output formats specified'
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif(not ply_app.HAS_STREAMING_FORM_DATA, reason='streaming-form-data not installed')
+def test_streaming_upload_aborts_on_header(client, tmp_path, monkeypatch):
+    def form_fallback(conversion_id):
+        raise AssertionError('werkzeug form parser used')
+    monkeypatch.setattr(ply_app, 'receive_upload_form', form_fallback)
+    
+    response = _upload(client, _binary_ply(vertex_count=10 ** 9) + b'\0' * (4 * ply_app.UPLOAD_CHUNK_SIZE))
+    assert response.status_code == 413
+    assert list(tmp_path.iterdir()) == []